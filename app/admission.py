@@ -0,0 +1,174 @@
+import os
+import time
+import asyncio
+from collections import deque
+
+try:
+    from app.metrics import metrics
+    from app.limiter import limiter
+except ImportError:
+    from metrics import metrics
+    from limiter import limiter
+
+
+def _parse_classes(spec: str) -> dict:
+    """'support:4,chat:1' -> {"support": 4.0, "chat": 1.0}"""
+    result = {}
+    for part in spec.split(","):
+        if ":" in part:
+            name, value = part.split(":", 1)
+            result[name.strip()] = float(value)
+    return result
+
+
+# Configuration
+# Relative share of upstream capacity per endpoint class under contention
+ADMISSION_WEIGHTS = _parse_classes(os.getenv("SENTINEL_ADMISSION_WEIGHTS", "support:4,chat:1"))
+# Longest a request of each class may wait for a slot before it is shed
+ADMISSION_BUDGET_MS = _parse_classes(os.getenv("SENTINEL_ADMISSION_BUDGET_MS", "support:3000,chat:1500"))
+DEFAULT_CLASS = "chat"
+
+
+class AdmissionRejected(Exception):
+    """Shed before reaching upstream (not retryable); `retry_after` in seconds."""
+
+    def __init__(self, priority_class: str, reason: str, retry_after: float):
+        super().__init__(f"Overloaded: {priority_class} request shed ({reason})")
+        self.priority_class = priority_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Weighted fair queuing in front of the upstream concurrency limit.
+
+    Capacity follows the AIMD limiter. When it is exhausted, requests wait
+    in a queue per class; each freed slot goes to the non-empty class with
+    the smallest virtual time, and serving a class advances its virtual
+    time by 1/weight (start-time fair queuing). A request is shed up front
+    when its expected wait already exceeds its class budget, or when it
+    has waited out the budget.
+    """
+
+    def __init__(self,
+                 weights: dict = None,
+                 budgets_ms: dict = None,
+                 capacity=lambda: int(limiter.limit)):
+        self.weights = dict(weights or ADMISSION_WEIGHTS)
+        self.budgets_ms = dict(budgets_ms or ADMISSION_BUDGET_MS)
+        self._capacity = capacity
+        self.in_flight = 0
+        self._queues = {name: deque() for name in self.weights}
+        self._vtime = {name: 0.0 for name in self.weights}
+        self._global_vtime = 0.0
+        # EWMA of how long a request holds its slot
+        self.service_ms = None
+        self.shed = {name: 0 for name in self.weights}
+
+    def _class_of(self, endpoint: str) -> str:
+        return endpoint if endpoint in self.weights else DEFAULT_CLASS
+
+    def _expected_wait_ms(self, cls: str) -> float:
+        if self.service_ms is None:
+            return 0.0
+        active = sum(self.weights[c] for c, q in self._queues.items() if q or c == cls)
+        share = self.weights[cls] / active
+        ahead = len(self._queues[cls]) + 1
+        return ahead * self.service_ms / (max(1, self._capacity()) * share)
+
+    def _shed(self, cls: str, reason: str, tags: list):
+        self.shed[cls] += 1
+        metrics.increment("sentinel.llm.shed", tags=tags + [f"reason:{reason}"])
+        retry_after = (self.service_ms or 1000) / 1000
+        raise AdmissionRejected(cls, reason, retry_after)
+
+    async def acquire(self, endpoint: str) -> float:
+        """Wait for a slot; returns the queue wait in ms or raises AdmissionRejected."""
+        cls = self._class_of(endpoint)
+        tags = [f"priority_class:{cls}"]
+        start = time.monotonic()
+
+        if self.in_flight < self._capacity() and not any(self._queues.values()):
+            self.in_flight += 1
+            self._advance(cls)
+            metrics.histogram("sentinel.llm.queue_wait", 0, tags=tags)
+            return 0.0
+
+        budget_ms = self.budgets_ms.get(cls, self.budgets_ms.get(DEFAULT_CLASS, 1000))
+        if self._expected_wait_ms(cls) > budget_ms:
+            self._shed(cls, "expected_wait", tags)
+
+        fut = asyncio.get_running_loop().create_future()
+        queue = self._queues[cls]
+        queue.append(fut)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), budget_ms / 1000)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                # Slot granted at the deadline: keep it
+                pass
+            else:
+                fut.cancel()
+                if fut in queue:
+                    queue.remove(fut)
+                self._shed(cls, "budget_exhausted", tags)
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()
+            else:
+                fut.cancel()
+                if fut in queue:
+                    queue.remove(fut)
+            raise
+
+        waited_ms = (time.monotonic() - start) * 1000
+        metrics.histogram("sentinel.llm.queue_wait", waited_ms, tags=tags)
+        return waited_ms
+
+    def _advance(self, cls: str):
+        # Virtual time follows the start tag of the request being served, so
+        # an idle class rejoins at "now" instead of cashing in saved-up credit
+        start_tag = max(self._vtime[cls], self._global_vtime)
+        self._global_vtime = start_tag
+        self._vtime[cls] = start_tag + 1.0 / self.weights[cls]
+
+    def release(self, service_ms: float = None):
+        if service_ms is not None:
+            self.service_ms = service_ms if self.service_ms is None else \
+                self.service_ms + 0.1 * (service_ms - self.service_ms)
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.in_flight < self._capacity():
+            candidates = [c for c, q in self._queues.items() if q]
+            if not candidates:
+                return
+            cls = min(candidates, key=lambda c: max(self._vtime[c], self._global_vtime))
+            fut = self._queues[cls].popleft()
+            if fut.done() or fut.get_loop().is_closed():
+                continue
+            self.in_flight += 1
+            self._advance(cls)
+            fut.get_loop().call_soon_threadsafe(self._grant, fut)
+
+    def _grant(self, fut):
+        if fut.done():
+            # Waiter gave up after the slot was assigned: hand it on
+            self.release()
+        else:
+            fut.set_result(None)
+
+    def stats(self) -> dict:
+        metrics.gauge("sentinel.llm.admission_queue", sum(len(q) for q in self._queues.values()))
+        return {
+            "in_flight": self.in_flight,
+            "capacity": self._capacity(),
+            "queued": {c: len(q) for c, q in self._queues.items()},
+            "shed": dict(self.shed),
+            "service_ms": round(self.service_ms, 1) if self.service_ms else None,
+        }
+
+
+admission = AdmissionController()
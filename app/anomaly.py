@@ -0,0 +1,147 @@
+import os
+import math
+import threading
+
+# Configuration
+ANOMALY_ALPHA = float(os.getenv("SENTINEL_ANOMALY_ALPHA", "0.05"))
+ANOMALY_Z_THRESHOLD = float(os.getenv("SENTINEL_ANOMALY_Z", "4.0"))
+# Observations a baseline needs before it may flag anything
+ANOMALY_WARMUP = int(os.getenv("SENTINEL_ANOMALY_WARMUP", "30"))
+# Block rate: a fast EWMA is compared against a slow one
+BLOCK_RATE_FAST_ALPHA = float(os.getenv("SENTINEL_ANOMALY_BLOCK_FAST_ALPHA", "0.1"))
+BLOCK_RATE_SLOW_ALPHA = float(os.getenv("SENTINEL_ANOMALY_BLOCK_SLOW_ALPHA", "0.01"))
+# Floor on the slow block rate so a clean history does not make one block a spike
+BLOCK_RATE_FLOOR = float(os.getenv("SENTINEL_ANOMALY_BLOCK_FLOOR", "0.02"))
+
+
+class EwmaBaseline:
+    """
+    Exponentially weighted mean and variance of a signal. Updates are
+    winsorized to mean +/- threshold sigma so one outlier cannot drag the
+    baseline towards itself.
+    """
+
+    __slots__ = ("alpha", "clip", "mean", "var", "count")
+
+    def __init__(self, alpha: float = ANOMALY_ALPHA, clip: float = ANOMALY_Z_THRESHOLD):
+        self.alpha = alpha
+        self.clip = clip
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+
+    def score(self, x: float) -> float:
+        """z-score of `x` against the baseline (0 until it has any spread)."""
+        if self.count < 2 or self.var <= 0:
+            return 0.0
+        return (x - self.mean) / math.sqrt(self.var)
+
+    def update(self, x: float):
+        self.count += 1
+        if self.count == 1:
+            self.mean = x
+            return
+        if self.var > 0:
+            sd = math.sqrt(self.var)
+            x = min(max(x, self.mean - self.clip * sd), self.mean + self.clip * sd)
+        diff = x - self.mean
+        incr = self.alpha * diff
+        self.mean += incr
+        self.var = (1 - self.alpha) * (self.var + diff * incr)
+
+
+class BlockRate:
+    """Fast vs slow EWMA of the blocked/not-blocked outcome."""
+
+    __slots__ = ("fast", "slow", "count")
+
+    def __init__(self):
+        self.fast = 0.0
+        self.slow = 0.0
+        self.count = 0
+
+    def observe(self, blocked: bool) -> float:
+        x = 1.0 if blocked else 0.0
+        self.count += 1
+        self.fast += BLOCK_RATE_FAST_ALPHA * (x - self.fast)
+        self.slow += BLOCK_RATE_SLOW_ALPHA * (x - self.slow)
+        # Std of a fast EWMA over Bernoulli(p) draws at the baseline rate p
+        p = max(self.slow, BLOCK_RATE_FLOOR)
+        sd = math.sqrt(p * (1 - p) * BLOCK_RATE_FAST_ALPHA / (2 - BLOCK_RATE_FAST_ALPHA))
+        return (self.fast - p) / sd
+
+
+class AnomalyDetector:
+    """
+    Online detector fed by record_metrics. Latency and token baselines are
+    kept per (model, endpoint) on a log scale (both are heavy-tailed); the
+    block rate is tracked per endpoint. Each observation is O(1) time and
+    the state is a few floats per key.
+    """
+
+    def __init__(self,
+                 threshold: float = ANOMALY_Z_THRESHOLD,
+                 warmup: int = ANOMALY_WARMUP,
+                 alpha: float = ANOMALY_ALPHA):
+        self.threshold = threshold
+        self.warmup = warmup
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._baselines = {}
+        self._block_rates = {}
+        self.flagged = 0
+
+    def observe(self, model: str, endpoint: str, latency_ms: float = None,
+                tokens: int = None, blocked: bool = False) -> dict:
+        """
+        Score one request, then fold it into the baselines.
+        Pass latency_ms/tokens as None when they say nothing about upstream
+        health (blocked requests, cache hits).
+        """
+        scores = {}
+        with self._lock:
+            key = (model, endpoint)
+            pair = self._baselines.get(key)
+            if pair is None:
+                pair = self._baselines[key] = (EwmaBaseline(self.alpha, self.threshold),
+                                               EwmaBaseline(self.alpha, self.threshold))
+            for name, baseline, value in (("latency", pair[0], latency_ms), ("tokens", pair[1], tokens)):
+                if value is None:
+                    continue
+                x = math.log1p(max(value, 0))
+                if baseline.count >= self.warmup:
+                    scores[name] = baseline.score(x)
+                baseline.update(x)
+
+            rate = self._block_rates.get(endpoint)
+            if rate is None:
+                rate = self._block_rates[endpoint] = BlockRate()
+            block_z = rate.observe(blocked)
+            if rate.count >= self.warmup:
+                scores["block_rate"] = block_z
+
+            # Only upward moves are incidents
+            flags = [name for name, z in scores.items() if z >= self.threshold]
+            if flags:
+                self.flagged += 1
+
+        return {
+            "score": round(max([0.0, *scores.values()]), 2),
+            "flags": flags,
+            **{f"{name}_z": round(z, 2) for name, z in scores.items()},
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "baselines": {
+                    f"{m}/{e}": {"latency_ms": round(math.expm1(lat.mean), 1),
+                                 "tokens": round(math.expm1(tok.mean), 1)}
+                    for (m, e), (lat, tok) in self._baselines.items()
+                },
+                "block_rate": {e: round(r.slow, 4) for e, r in self._block_rates.items()},
+                "flagged": self.flagged,
+            }
+
+
+detector = AnomalyDetector()
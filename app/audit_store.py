@@ -0,0 +1,339 @@
+"""
+Append-only local audit store for request records (SQLite, WAL mode).
+
+    python -m app.audit_store trace <trace_id>
+    python -m app.audit_store category injection --since 3600 [--limit 50]
+    python -m app.audit_store range --since 86400 [--until 0]
+    python -m app.audit_store purge [--retention-days 30]
+    python -m app.audit_store stats
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import argparse
+import threading
+from contextlib import closing
+
+try:
+    from app.metrics import metrics
+    from app.log_sink import cap_fields
+except ImportError:
+    from metrics import metrics
+    from log_sink import cap_fields
+
+logger = logging.getLogger("llm-sentinel")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Configuration
+AUDIT_ENABLED = os.getenv("SENTINEL_AUDIT_ENABLED", "true").lower() == "true"
+AUDIT_DB_PATH = os.getenv("SENTINEL_AUDIT_DB", os.path.join(BASE_DIR, "logs", "audit.db"))
+AUDIT_QUEUE_SIZE = int(os.getenv("SENTINEL_AUDIT_QUEUE_SIZE", "20000"))
+AUDIT_BATCH_SIZE = int(os.getenv("SENTINEL_AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("SENTINEL_AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_RETENTION_DAYS = float(os.getenv("SENTINEL_AUDIT_RETENTION_DAYS", "30"))
+# How often the writer thread runs the retention job (0 disables it)
+AUDIT_RETENTION_INTERVAL = float(os.getenv("SENTINEL_AUDIT_RETENTION_INTERVAL", "3600"))
+
+_STOP = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    id            INTEGER PRIMARY KEY,
+    ts            REAL    NOT NULL,
+    trace_id      TEXT    NOT NULL,
+    model         TEXT,
+    endpoint      TEXT,
+    category      TEXT    NOT NULL,
+    risk          TEXT,
+    rules_version TEXT,
+    latency_ms    REAL,
+    error         INTEGER NOT NULL DEFAULT 0,
+    cache_hit     INTEGER NOT NULL DEFAULT 0,
+    record        TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_requests_trace_id ON requests (trace_id);
+CREATE INDEX IF NOT EXISTS idx_requests_category_ts ON requests (category, ts);
+CREATE INDEX IF NOT EXISTS idx_requests_ts ON requests (ts);
+"""
+
+_INSERT = ("INSERT INTO requests (ts, trace_id, model, endpoint, category, risk, rules_version,"
+           " latency_ms, error, cache_hit, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def connect(path: str = AUDIT_DB_PATH) -> sqlite3.Connection:
+    """Open (and if needed create) the store. Every connection runs in WAL mode."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    # auto_vacuum only takes effect before the first table is created
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def to_row(entry: dict) -> tuple:
+    security = entry.get("security") or {}
+    return (
+        float(entry.get("timestamp") or time.time()),
+        entry.get("trace_id") or "",
+        entry.get("model"),
+        entry.get("endpoint"),
+        security.get("category", "clean"),
+        security.get("risk", "low"),
+        security.get("rules_version"),
+        entry.get("latency_ms"),
+        1 if entry.get("error") else 0,
+        1 if entry.get("cache_hit") else 0,
+        json.dumps(cap_fields(entry), default=str, separators=(",", ":")),
+    )
+
+
+def _records(cursor) -> list:
+    return [json.loads(row[0]) for row in cursor]
+
+
+class AuditStore:
+    """
+    Batched writer in front of the SQLite store. `append` only enqueues;
+    a daemon thread commits rows in batches of up to `batch_size` (or every
+    `flush_interval` seconds) and runs the retention job between batches.
+    """
+
+    def __init__(self,
+                 path: str = AUDIT_DB_PATH,
+                 maxsize: int = AUDIT_QUEUE_SIZE,
+                 batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL,
+                 retention_days: float = AUDIT_RETENTION_DAYS,
+                 retention_interval: float = AUDIT_RETENTION_INTERVAL):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.retention_interval = retention_interval
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._conn = None
+        self._last_retention = time.monotonic()
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
+    # Hot path
+    def append(self, entry: dict) -> bool:
+        """Non-blocking enqueue. Returns False when the record was dropped."""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            metrics.increment("sentinel.audit.dropped")
+            return False
+        self.enqueued += 1
+        return True
+
+    # Background worker
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="sentinel-audit-writer", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        if self._conn is None:
+            self._conn = connect(self.path)
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            if batch:
+                self.write_batch(batch)
+            if stop:
+                pending = []
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        pending.append(item)
+                for i in range(0, len(pending), self.batch_size):
+                    self.write_batch(pending[i:i + self.batch_size])
+                return
+
+            if (self.retention_interval > 0
+                    and time.monotonic() - self._last_retention >= self.retention_interval):
+                self._last_retention = time.monotonic()
+                try:
+                    self.purge()
+                except Exception as e:
+                    logger.warning(f"Audit store retention job failed: {e}")
+
+    def write_batch(self, batch: list):
+        """Insert records in one transaction (writer thread, or bulk loads)."""
+        if self._conn is None:
+            self._conn = connect(self.path)
+        try:
+            with self._conn:
+                self._conn.executemany(_INSERT, [to_row(entry) for entry in batch])
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            metrics.increment("sentinel.audit.failed", len(batch))
+            logger.warning(f"Audit store write failed: {e}")
+        metrics.gauge("sentinel.audit.queue_depth", self._queue.qsize())
+
+    # Retention / compaction
+    def purge(self, retention_days: float = None, chunk: int = 50000) -> int:
+        """Delete records older than the retention window, then reclaim space."""
+        days = self.retention_days if retention_days is None else retention_days
+        if days <= 0:
+            return 0
+        conn = self._conn or connect(self.path)
+        cutoff = time.time() - days * 86400
+        deleted = 0
+        # Small chunks keep each write transaction (and reader stalls) short
+        while True:
+            with conn:
+                cur = conn.execute(
+                    "DELETE FROM requests WHERE id IN "
+                    "(SELECT id FROM requests WHERE ts < ? ORDER BY ts LIMIT ?)",
+                    (cutoff, chunk),
+                )
+            deleted += cur.rowcount
+            if cur.rowcount < chunk:
+                break
+        if deleted:
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            metrics.increment("sentinel.audit.purged", deleted)
+            logger.info(f"Audit store purged {deleted} records older than {days:g} days")
+        if conn is not self._conn:
+            conn.close()
+        return deleted
+
+    # Lifecycle
+    def flush(self, timeout: float = 10.0):
+        """Write pending records and stop the worker (restarted on next append)."""
+        worker = self._worker
+        if worker is None or not worker.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        worker.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+
+# -------------------------
+# Queries (own read connection; WAL readers never block the writer)
+# -------------------------
+
+def find_by_trace(trace_id: str, path: str = AUDIT_DB_PATH) -> list:
+    with closing(connect(path)) as conn:
+        return _records(conn.execute(
+            "SELECT record FROM requests WHERE trace_id = ? ORDER BY ts", (trace_id,)))
+
+
+def find_by_category(category: str, since: float = 0, until: float = None,
+                     limit: int = 100, path: str = AUDIT_DB_PATH) -> list:
+    """Most recent records of a risk category inside [since, until)."""
+    with closing(connect(path)) as conn:
+        return _records(conn.execute(
+            "SELECT record FROM requests WHERE category = ? AND ts >= ? AND ts < ?"
+            " ORDER BY ts DESC LIMIT ?",
+            (category, since, until if until is not None else float("inf"), limit)))
+
+
+def find_between(since: float, until: float = None, limit: int = 100,
+                 path: str = AUDIT_DB_PATH) -> list:
+    with closing(connect(path)) as conn:
+        return _records(conn.execute(
+            "SELECT record FROM requests WHERE ts >= ? AND ts < ? ORDER BY ts DESC LIMIT ?",
+            (since, until if until is not None else float("inf"), limit)))
+
+
+def summary(path: str = AUDIT_DB_PATH) -> dict:
+    with closing(connect(path)) as conn:
+        total, first, last = conn.execute("SELECT COUNT(*), MIN(ts), MAX(ts) FROM requests").fetchone()
+        categories = dict(conn.execute(
+            "SELECT category, COUNT(*) FROM requests GROUP BY category").fetchall())
+    return {"records": total, "first_ts": first, "last_ts": last, "categories": categories}
+
+
+audit_store = AuditStore()
+atexit.register(audit_store.flush)
+
+
+def record(entry: dict) -> bool:
+    return audit_store.append(entry) if AUDIT_ENABLED else False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the LLM Sentinel audit store")
+    parser.add_argument("--db", default=AUDIT_DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("trace")
+    p.add_argument("trace_id")
+    for name in ("category", "range"):
+        p = sub.add_parser(name)
+        if name == "category":
+            p.add_argument("category")
+        p.add_argument("--since", type=float, default=3600, help="seconds ago")
+        p.add_argument("--until", type=float, default=0, help="seconds ago")
+        p.add_argument("--limit", type=int, default=50)
+    p = sub.add_parser("purge")
+    p.add_argument("--retention-days", type=float, default=AUDIT_RETENTION_DAYS)
+    sub.add_parser("stats")
+    args = parser.parse_args()
+
+    now = time.time()
+    if args.command == "trace":
+        result = find_by_trace(args.trace_id, path=args.db)
+    elif args.command == "category":
+        result = find_by_category(args.category, now - args.since, now - args.until,
+                                  args.limit, path=args.db)
+    elif args.command == "range":
+        result = find_between(now - args.since, now - args.until, args.limit, path=args.db)
+    elif args.command == "purge":
+        result = {"deleted": AuditStore(args.db).purge(args.retention_days)}
+    else:
+        result = summary(path=args.db)
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import os
+import random
+import asyncio
+import hashlib
+import threading
+
+# Configuration
+# "gemini" (default) or "mock" (local simulation, no network, no tokens spent)
+BACKEND = os.getenv("SENTINEL_BACKEND", "gemini").lower()
+
+MOCK_LATENCY_MS = float(os.getenv("SENTINEL_MOCK_LATENCY_MS", "400"))
+# Per-model median latency overrides, e.g. "gemini-2.0-flash:3000,gemini-2.0-flash-lite:300"
+MOCK_MODEL_LATENCY_MS = {
+    name.strip(): float(ms)
+    for name, ms in (part.split(":", 1) for part in os.getenv("SENTINEL_MOCK_MODEL_LATENCY_MS", "").split(",") if ":" in part)
+}
+# Lognormal spread around the median latency (0 = fixed latency)
+MOCK_LATENCY_SIGMA = float(os.getenv("SENTINEL_MOCK_LATENCY_SIGMA", "0.35"))
+# Share of the latency spent before the first streamed chunk
+MOCK_TTFT_FRACTION = float(os.getenv("SENTINEL_MOCK_TTFT_FRACTION", "0.3"))
+MOCK_OUTPUT_TOKENS = int(os.getenv("SENTINEL_MOCK_OUTPUT_TOKENS", "150"))
+MOCK_CHUNK_TOKENS = int(os.getenv("SENTINEL_MOCK_CHUNK_TOKENS", "20"))
+MOCK_ERROR_429_RATE = float(os.getenv("SENTINEL_MOCK_ERROR_429_RATE", "0"))
+MOCK_ERROR_500_RATE = float(os.getenv("SENTINEL_MOCK_ERROR_500_RATE", "0"))
+MOCK_SEED = int(os.getenv("SENTINEL_MOCK_SEED", "42"))
+
+_FILLER = ("the", "account", "settings", "page", "lets", "you", "update", "your", "profile",
+           "and", "review", "recent", "activity", "before", "contacting", "support")
+
+
+class GeminiBackend:
+    """Google GenAI client (the production path)."""
+
+    name = "gemini"
+
+    def __init__(self, client=None):
+        self._client = client
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Built on first use: importing google.genai alone is a large share of cold start."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from google import genai
+                    self._client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+        return self._client
+
+    async def warm_up(self, model: str):
+        """
+        Build the client off the event loop, then make one cheap call
+        (model metadata) so DNS, TLS and the SDK's own first-call setup
+        are paid before a user request needs them.
+        """
+        client = await asyncio.to_thread(lambda: self.client)
+        await client.aio.models.get(model=model)
+
+    async def generate(self, model: str, prompt: str, config):
+        return await self.client.aio.models.generate_content(model=model, contents=prompt, config=config)
+
+    async def stream(self, model: str, prompt: str, config):
+        async for chunk in self.client.aio.models.generate_content_stream(
+            model=model, contents=prompt, config=config
+        ):
+            yield chunk
+
+
+class MockUsage:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class MockResponse:
+    """Same attributes the gateway reads from a GenerateContentResponse."""
+
+    def __init__(self, text: str, usage_metadata: MockUsage):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class MockUpstreamError(Exception):
+    """Injected failure; the message mimics the real API so retry/limiter logic applies."""
+
+
+class MockBackend:
+    """
+    Deterministic local stand-in for Gemini. A prompt always gets the same
+    answer and token counts (seeded by its hash); latency and injected
+    429/500 errors come from one seeded generator, so a sequential run
+    replays identically.
+    """
+
+    name = "mock"
+
+    def __init__(self,
+                 latency_ms: float = MOCK_LATENCY_MS,
+                 model_latency_ms: dict = None,
+                 latency_sigma: float = MOCK_LATENCY_SIGMA,
+                 ttft_fraction: float = MOCK_TTFT_FRACTION,
+                 output_tokens: int = MOCK_OUTPUT_TOKENS,
+                 chunk_tokens: int = MOCK_CHUNK_TOKENS,
+                 error_429_rate: float = MOCK_ERROR_429_RATE,
+                 error_500_rate: float = MOCK_ERROR_500_RATE,
+                 seed: int = MOCK_SEED):
+        self.latency_ms = latency_ms
+        self.model_latency_ms = MOCK_MODEL_LATENCY_MS if model_latency_ms is None else model_latency_ms
+        self.latency_sigma = latency_sigma
+        self.ttft_fraction = ttft_fraction
+        self.output_tokens = output_tokens
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.error_429_rate = error_429_rate
+        self.error_500_rate = error_500_rate
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.simulated_ms = 0.0
+
+    async def warm_up(self, model: str):
+        """Nothing to open locally."""
+
+    def _answer(self, prompt: str):
+        digest = hashlib.sha1(f"{self.seed}:{prompt}".encode("utf-8")).digest()
+        rng = random.Random(digest)
+        tokens = max(1, int(rng.gauss(self.output_tokens, self.output_tokens * 0.2)))
+        words = [rng.choice(_FILLER) for _ in range(tokens)]
+        return words, max(1, len(prompt) // 4)
+
+    def _draw(self, model: str = None):
+        """Latency (seconds) and the error to raise, if any, for one call."""
+        self.calls += 1
+        latency = self.model_latency_ms.get(model, self.latency_ms)
+        if self.latency_sigma > 0:
+            latency *= self._rng.lognormvariate(0, self.latency_sigma)
+        self.simulated_ms += latency
+        roll = self._rng.random()
+        if roll < self.error_429_rate:
+            return latency / 1000, MockUpstreamError("429 RESOURCE_EXHAUSTED: mock rate limit")
+        if roll < self.error_429_rate + self.error_500_rate:
+            return latency / 1000, MockUpstreamError("500 INTERNAL: mock server error")
+        return latency / 1000, None
+
+    async def generate(self, model: str, prompt: str, config=None) -> MockResponse:
+        latency, error = self._draw(model)
+        await asyncio.sleep(latency)
+        if error:
+            raise error
+        words, prompt_tokens = self._answer(prompt)
+        return MockResponse(" ".join(words), MockUsage(prompt_tokens, len(words)))
+
+    async def stream(self, model: str, prompt: str, config=None):
+        latency, error = self._draw(model)
+        await asyncio.sleep(latency * self.ttft_fraction)
+        if error:
+            raise error
+        words, prompt_tokens = self._answer(prompt)
+        chunks = [words[i:i + self.chunk_tokens] for i in range(0, len(words), self.chunk_tokens)]
+        gap = latency * (1 - self.ttft_fraction) / max(1, len(chunks) - 1)
+        sent = 0
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(gap)
+            sent += len(chunk)
+            text = " ".join(chunk) + (" " if i < len(chunks) - 1 else "")
+            # Cumulative usage on every chunk, like the real stream
+            yield MockResponse(text, MockUsage(prompt_tokens, sent))
+
+
+def create_backend(name: str = BACKEND):
+    if name == "mock":
+        return MockBackend()
+    if name == "gemini":
+        return GeminiBackend()
+    raise ValueError(f"Unknown SENTINEL_BACKEND: {name}")
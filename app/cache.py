@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    from app.metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+# Configuration
+CACHE_MAX_BYTES = int(os.getenv("SENTINEL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CACHE_MAX_ENTRIES = int(os.getenv("SENTINEL_CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("SENTINEL_CACHE_TTL_SECONDS", "600"))
+# Endpoints whose responses may be served from cache ("support", "chat")
+CACHE_ENDPOINTS = {e.strip() for e in os.getenv("SENTINEL_CACHE_ENDPOINTS", "support").split(",") if e.strip()}
+
+# Rough per-entry bookkeeping cost on top of the stored strings
+_ENTRY_OVERHEAD = 256
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace and case so trivially different FAQ prompts share an entry."""
+    return " ".join(prompt.split()).lower()
+
+
+def cache_key(prompt: str, system_instr: str, model: str, config: dict) -> str:
+    payload = json.dumps(
+        [normalize_prompt(prompt), system_instr or "", model, config],
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Exact-match LRU cache for model responses with a TTL and a memory cap.
+    Entries are (expires_at, size, response_text, usage).
+    """
+
+    def __init__(self,
+                 max_bytes: int = CACHE_MAX_BYTES,
+                 max_entries: int = CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, tags: list = None):
+        """Returns (response_text, usage) or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._evict(key, "ttl", tags)
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        metrics.increment("sentinel.llm.cache.hit" if entry else "sentinel.llm.cache.miss", tags=tags)
+        return (entry[2], dict(entry[3])) if entry else None
+
+    def put(self, key: str, response_text: str, usage: dict, tags: list = None):
+        size = _ENTRY_OVERHEAD + sys.getsizeof(key) + sys.getsizeof(response_text)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._evict(key, "replaced", tags)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, response_text, dict(usage))
+            self.bytes += size
+            while self._entries and (self.bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                oldest = next(iter(self._entries))
+                self._evict(oldest, "lru", tags)
+            current = self.bytes
+        metrics.gauge("sentinel.llm.cache.bytes", current)
+
+    def _evict(self, key: str, reason: str, tags: list = None):
+        # Caller holds the lock
+        _, size, _, _ = self._entries.pop(key)
+        self.bytes -= size
+        if reason != "replaced":
+            self.evictions += 1
+            metrics.increment("sentinel.llm.cache.eviction", tags=(tags or []) + [f"reason:{reason}"])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+response_cache = ResponseCache()
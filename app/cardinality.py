@@ -0,0 +1,107 @@
+import os
+import math
+import zlib
+import threading
+
+# Configuration
+TAG_TOP_K = int(os.getenv("SENTINEL_TAG_TOP_K", "50"))
+# A value must be seen this many times (guaranteed, not estimated) to keep its own tag
+TAG_MIN_COUNT = int(os.getenv("SENTINEL_TAG_MIN_COUNT", "3"))
+OTHER = "other"
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter sketch: tracks at most `k` values. A new value
+    evicts the current minimum and inherits its count as estimation error,
+    so `count - error` is a guaranteed lower bound on real occurrences.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.counts = {}
+        self.errors = {}
+
+    def offer(self, value: str) -> int:
+        """Record one occurrence; returns the guaranteed count for `value`."""
+        counts = self.counts
+        if value in counts:
+            counts[value] += 1
+        elif len(counts) < self.k:
+            counts[value] = 1
+            self.errors[value] = 0
+        else:
+            victim = min(counts, key=counts.get)
+            floor = counts.pop(victim)
+            del self.errors[victim]
+            counts[value] = floor + 1
+            self.errors[value] = floor
+        return counts[value] - self.errors[value]
+
+    def top(self, n: int = None) -> list:
+        ranked = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)
+        return ranked[:n] if n else ranked
+
+
+class DistinctCounter:
+    """Linear-counting estimate of distinct values in a fixed 8 KB bitmap."""
+
+    def __init__(self, bits: int = 1 << 16):
+        self.bits = bits
+        self._bitmap = bytearray(bits // 8)
+        self._zeros = bits
+
+    def add(self, value: str):
+        h = zlib.crc32(value.encode("utf-8")) % self.bits
+        byte, mask = h >> 3, 1 << (h & 7)
+        if not self._bitmap[byte] & mask:
+            self._bitmap[byte] |= mask
+            self._zeros -= 1
+
+    def estimate(self) -> int:
+        if self._zeros == 0:
+            return self.bits
+        return int(round(-self.bits * math.log(self._zeros / self.bits)))
+
+
+class TagGovernor:
+    """
+    Bounds the number of distinct values each governed tag can take.
+    Values that are not (yet) heavy hitters are folded into `other`; the
+    distinct values folded away are counted so suppression stays visible.
+    Only open-ended dimensions are governed: bounded ones such as the
+    rulebook `category` must never hide a value's first occurrences.
+    """
+
+    def __init__(self, dimensions: tuple = ("prompt_snippet", "api_key"),
+                 k: int = TAG_TOP_K, min_count: int = TAG_MIN_COUNT):
+        self.min_count = min_count
+        self._lock = threading.Lock()
+        self._sketches = {d: SpaceSaving(k) for d in dimensions}
+        self._suppressed = {d: DistinctCounter() for d in dimensions}
+        self.suppressed_tags = {d: 0 for d in dimensions}
+
+    def govern(self, dimension: str, value: str) -> str:
+        sketch = self._sketches.get(dimension)
+        if sketch is None:
+            return value
+        with self._lock:
+            if sketch.offer(value) >= self.min_count:
+                return value
+            self._suppressed[dimension].add(value)
+            self.suppressed_tags[dimension] += 1
+        return OTHER
+
+    def suppressed_series(self) -> dict:
+        """Estimated distinct values per dimension folded into `other`."""
+        return {d: c.estimate() for d, c in self._suppressed.items()}
+
+    def stats(self) -> dict:
+        return {
+            "suppressed_series": self.suppressed_series(),
+            "suppressed_tags": dict(self.suppressed_tags),
+            "top": {d: s.top(10) for d, s in self._sketches.items()},
+        }
+
+
+governor = TagGovernor()
@@ -0,0 +1,83 @@
+import os
+import asyncio
+
+try:
+    from app.metrics import metrics
+    from app.deadline import DeadlineExceeded, remaining_seconds
+except ImportError:
+    from metrics import metrics
+    from deadline import DeadlineExceeded, remaining_seconds
+
+# Configuration
+COALESCE_ENABLED = os.getenv("SENTINEL_COALESCE_ENABLED", "1") != "0"
+
+
+class SingleFlight:
+    """
+    Collapses identical concurrent upstream calls into one shared task.
+    Every caller awaits the task through `asyncio.shield`, so a waiter that
+    is cancelled (client went away) or runs out of its own deadline never
+    cancels the call for the others; only when the last waiter is gone is
+    the shared call itself cancelled.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        # task -> deadlines of the callers currently waiting on it
+        self._waiters = {}
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def do(self, key, fn, tags: list = None, deadline: float = None):
+        """
+        Returns (result, shared) where shared is True for followers.
+        `fn(latest_deadline)` starts the shared call; latest_deadline() is the
+        latest deadline among the current waiters (None if one has none).
+        Each waiter gets DeadlineExceeded when its own `deadline` passes.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        # Tasks are bound to their loop (Streamlit runs one loop per call)
+        shared = task is not None and not task.done() and task.get_loop() is loop
+
+        if not shared:
+            deadlines = []
+            task = loop.create_task(fn(lambda: _latest(deadlines)))
+            self._inflight[key] = task
+            self._waiters[task] = deadlines
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            metrics.increment("sentinel.llm.coalesced", tags=tags)
+
+        deadlines = self._waiters.setdefault(task, [])
+        deadlines.append(deadline)
+        try:
+            async with asyncio.timeout(remaining_seconds(deadline)) as budget:
+                return await asyncio.shield(task), shared
+        except TimeoutError:
+            if not budget.expired():
+                raise
+            raise DeadlineExceeded("Deadline exceeded before upstream answered")
+        finally:
+            deadlines.remove(deadline)
+            if not deadlines and not task.done():
+                # Nobody is left to read the answer
+                task.cancel()
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        self._waiters.pop(task, None)
+        # Mark the exception retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+
+def _latest(deadlines: list):
+    if not deadlines or None in deadlines:
+        return None
+    return max(deadlines)
+
+
+inflight = SingleFlight()
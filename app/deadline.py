@@ -0,0 +1,72 @@
+import os
+import time
+
+from tenacity.stop import stop_base
+
+try:
+    from app.metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+# Configuration
+# Client-supplied budget for the whole request, in milliseconds
+DEADLINE_HEADER = os.getenv("SENTINEL_DEADLINE_HEADER", "X-Request-Timeout-Ms")
+# Defaults when the header is absent; endpoints not listed get no deadline
+DEADLINE_DEFAULT_MS = {
+    name.strip(): float(ms)
+    for name, ms in (part.split(":", 1) for part in os.getenv(
+        "SENTINEL_DEADLINE_DEFAULT_MS", "chat:30000,support:30000").split(",") if ":" in part)
+}
+DEADLINE_MAX_MS = float(os.getenv("SENTINEL_DEADLINE_MAX_MS", "120000"))
+# Don't start another attempt with less than this left
+DEADLINE_MIN_ATTEMPT_MS = float(os.getenv("SENTINEL_DEADLINE_MIN_ATTEMPT_MS", "1000"))
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before upstream answered (not retryable)."""
+
+
+def deadline_for(endpoint: str, header_value: str = None):
+    """Absolute time.monotonic() deadline for a request, or None for no deadline."""
+    budget_ms = DEADLINE_DEFAULT_MS.get(endpoint)
+    if header_value:
+        try:
+            budget_ms = float(header_value)
+        except ValueError:
+            pass
+    if budget_ms is None or budget_ms <= 0:
+        return None
+    return time.monotonic() + min(budget_ms, DEADLINE_MAX_MS) / 1000
+
+
+def remaining_seconds(deadline):
+    """
+    Seconds left (may be negative), or None without a deadline. `deadline`
+    may also be a callable returning one (a coalesced call's latest waiter).
+    """
+    if callable(deadline):
+        deadline = deadline()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def record_cancelled(endpoint: str, reason: str, elapsed_ms: float):
+    """Work abandoned before it finished: nobody was going to read the answer."""
+    tags = [f"endpoint:{endpoint}", f"reason:{reason}"]
+    metrics.increment("sentinel.llm.cancelled", tags=tags)
+    metrics.histogram("sentinel.llm.cancelled.elapsed_ms", elapsed_ms, tags=tags)
+
+
+class stop_before_deadline(stop_base):
+    """
+    Tenacity stop condition: give up instead of sleeping into a retry that
+    could not finish before the call's `deadline` keyword argument.
+    """
+
+    def __call__(self, retry_state) -> bool:
+        remaining = remaining_seconds(retry_state.kwargs.get("deadline"))
+        if remaining is None:
+            return False
+        if (remaining - retry_state.upcoming_sleep) * 1000 < DEADLINE_MIN_ATTEMPT_MS:
+            metrics.increment("sentinel.llm.retry_skipped", tags=["reason:deadline"])
+            return True
+        return False
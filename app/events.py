@@ -0,0 +1,184 @@
+import os
+import queue
+import threading
+import time
+import atexit
+import logging
+
+try:
+    from app.metrics import metrics
+    from app.stages import record_stage
+    from app.startup import init_datadog
+except ImportError:
+    from metrics import metrics
+    from stages import record_stage
+    from startup import init_datadog
+
+logger = logging.getLogger("llm-sentinel")
+
+# Configuration
+EVENT_QUEUE_SIZE = int(os.getenv("SENTINEL_EVENT_QUEUE_SIZE", "1000"))
+EVENT_BATCH_SIZE = int(os.getenv("SENTINEL_EVENT_BATCH_SIZE", "25"))
+EVENT_FLUSH_INTERVAL = float(os.getenv("SENTINEL_EVENT_FLUSH_INTERVAL", "1.0"))
+# "drop_new" (default) or "drop_oldest"; submit() runs on the event loop, so it never waits
+EVENT_QUEUE_POLICY = os.getenv("SENTINEL_EVENT_QUEUE_POLICY", "drop_new")
+
+_STOP = object()
+
+
+def _create_event(event: dict):
+    # datadog is imported and initialized by the first event, on the worker thread
+    from datadog import api
+    init_datadog()
+    return api.Event.create(**event)
+
+
+class EventDispatcher:
+    """
+    Bounded in-process queue in front of `api.Event.create`.
+    The request path only enqueues; a daemon thread drains the queue in
+    batches so a burst of incidents never blocks the event loop.
+    """
+
+    def __init__(self,
+                 maxsize: int = EVENT_QUEUE_SIZE,
+                 batch_size: int = EVENT_BATCH_SIZE,
+                 flush_interval: float = EVENT_FLUSH_INTERVAL,
+                 policy: str = EVENT_QUEUE_POLICY,
+                 sender=None):
+        if policy not in ("drop_new", "drop_oldest"):
+            raise ValueError(f"Unknown event queue policy: {policy} (use drop_new or drop_oldest)")
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self._send = sender or _create_event
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._worker = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+
+    # Hot path
+    def submit(self, **event) -> bool:
+        """Non-blocking enqueue. Returns False when the event was dropped."""
+        self._ensure_worker()
+
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            if self.policy != "drop_oldest":
+                self._drop("queue_full")
+                return False
+            # Make room by discarding the oldest pending event
+            try:
+                self._queue.get_nowait()
+                self._drop("evicted")
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self._drop("queue_full")
+                return False
+
+        self.enqueued += 1
+        return True
+
+    def _drop(self, reason: str):
+        self.dropped += 1
+        metrics.increment("sentinel.events.dropped", tags=[f"reason:{reason}"])
+
+    # Background worker
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="sentinel-event-dispatcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    if timeout > 0:
+                        item = self._queue.get(timeout=timeout)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            if batch:
+                self._send_batch(batch)
+            if stop:
+                # Drain whatever is still pending before exiting
+                pending = []
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        pending.append(item)
+                for i in range(0, len(pending), self.batch_size):
+                    self._send_batch(pending[i:i + self.batch_size])
+                return
+
+    def _send_batch(self, batch: list):
+        sent = 0
+        for event in batch:
+            start = time.perf_counter()
+            try:
+                self._send(event)
+                sent += 1
+            except Exception as e:
+                self.failed += 1
+                metrics.increment("sentinel.events.failed")
+                logger.warning(f"Datadog event dispatch failed: {e}")
+            # Off the request path: rolling stats only, no request breakdown
+            record_stage("event_dispatch", (time.perf_counter() - start) * 1000)
+        self.sent += sent
+        metrics.gauge("sentinel.events.queue_depth", self._queue.qsize())
+        metrics.increment("sentinel.events.sent", sent)
+
+    # Lifecycle
+    def flush(self, timeout: float = 5.0):
+        """Drain pending events and stop the worker (restarted on next submit)."""
+        worker = self._worker
+        if worker is None or not worker.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        worker.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "sent": self.sent,
+            "failed": self.failed,
+            "policy": self.policy,
+        }
+
+
+dispatcher = EventDispatcher()
+atexit.register(dispatcher.flush)
+
+
+def submit_event(**event) -> bool:
+    return dispatcher.submit(**event)
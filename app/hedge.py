@@ -0,0 +1,120 @@
+import os
+import time
+import threading
+
+try:
+    from app.metrics import metrics
+    from app.sketch import WindowedSketch
+except ImportError:
+    from metrics import metrics
+    from sketch import WindowedSketch
+
+# Configuration
+# Endpoints whose upstream calls may be hedged, e.g. "support" or "support,chat" (empty = off)
+HEDGE_ENDPOINTS = {e.strip() for e in os.getenv("SENTINEL_HEDGE_ENDPOINTS", "").split(",") if e.strip()}
+# Send the duplicate once the first call is slower than this rolling quantile for its model
+HEDGE_QUANTILE = float(os.getenv("SENTINEL_HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_DELAY_MS = float(os.getenv("SENTINEL_HEDGE_MIN_DELAY_MS", "50"))
+HEDGE_MIN_SAMPLES = int(os.getenv("SENTINEL_HEDGE_MIN_SAMPLES", "50"))
+HEDGE_WINDOW_SECONDS = float(os.getenv("SENTINEL_HEDGE_WINDOW_SECONDS", "300"))
+# Extra upstream calls allowed, as a fraction of first calls
+HEDGE_BUDGET_RATIO = float(os.getenv("SENTINEL_HEDGE_BUDGET_RATIO", "0.05"))
+HEDGE_BUDGET_BURST = float(os.getenv("SENTINEL_HEDGE_BUDGET_BURST", "10"))
+
+
+class HedgePolicy:
+    """
+    When to send a duplicate upstream call, and whether one is affordable.
+
+    The delay is the rolling `quantile` of successful call latency per
+    model (recomputed at most once a second), so roughly the slowest 5% of
+    calls get a hedge. A budget bucket earns `budget_ratio` for every first
+    call and spends 1 per hedge, which caps hedges at that fraction of
+    traffic even when upstream is slow across the board.
+    """
+
+    def __init__(self,
+                 endpoints: set = None,
+                 quantile: float = HEDGE_QUANTILE,
+                 min_delay_ms: float = HEDGE_MIN_DELAY_MS,
+                 min_samples: int = HEDGE_MIN_SAMPLES,
+                 window_seconds: float = HEDGE_WINDOW_SECONDS,
+                 budget_ratio: float = HEDGE_BUDGET_RATIO,
+                 budget_burst: float = HEDGE_BUDGET_BURST,
+                 clock=time.monotonic):
+        self.endpoints = set(HEDGE_ENDPOINTS if endpoints is None else endpoints)
+        self.quantile = quantile
+        self.min_delay_ms = min_delay_ms
+        self.min_samples = min_samples
+        self.window_seconds = window_seconds
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._latency = {}
+        # model -> (computed_at, delay_ms or None)
+        self._delays = {}
+        self.budget = 0.0
+        self.sent = 0
+        self.won = 0
+
+    def enabled(self, endpoint: str) -> bool:
+        return endpoint in self.endpoints
+
+    def record(self, model: str, latency_ms: float):
+        """Latency of one successful upstream call."""
+        now = self._clock()
+        with self._lock:
+            sketch = self._latency.get(model)
+            if sketch is None:
+                sketch = self._latency[model] = WindowedSketch(self.window_seconds)
+            sketch.add(latency_ms, now)
+
+    def delay_ms(self, model: str):
+        """How long to wait before hedging, or None while there is too little data."""
+        now = self._clock()
+        with self._lock:
+            # Every first call that may be hedged earns a share of the budget
+            self.budget = min(self.budget_burst, self.budget + self.budget_ratio)
+            cached = self._delays.get(model)
+            if cached is not None and now - cached[0] < 1.0:
+                return cached[1]
+            sketch = self._latency.get(model)
+            snapshot = sketch.snapshot(now) if sketch is not None else None
+            if snapshot is None or snapshot.count < self.min_samples:
+                delay = None
+            else:
+                delay = max(self.min_delay_ms, snapshot.quantile(self.quantile))
+            self._delays[model] = (now, delay)
+            return delay
+
+    def try_spend(self, tags: list) -> bool:
+        with self._lock:
+            if self.budget < 1:
+                allowed = False
+            else:
+                self.budget -= 1
+                self.sent += 1
+                allowed = True
+        if allowed:
+            metrics.increment("sentinel.llm.hedge.sent", tags=tags)
+        else:
+            metrics.increment("sentinel.llm.hedge.skipped", tags=tags + ["reason:budget"])
+        return allowed
+
+    def record_win(self, tags: list):
+        with self._lock:
+            self.won += 1
+        metrics.increment("sentinel.llm.hedge.won", tags=tags)
+
+    def stats(self) -> dict:
+        return {
+            "endpoints": sorted(self.endpoints),
+            "sent": self.sent,
+            "won": self.won,
+            "budget": round(self.budget, 2),
+            "delay_ms": {m: round(d, 1) for m, (_, d) in self._delays.items() if d is not None},
+        }
+
+
+hedger = HedgePolicy()
@@ -0,0 +1,179 @@
+import os
+import time
+import asyncio
+from collections import deque
+
+try:
+    from app.metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+# Configuration
+LIMIT_INITIAL = float(os.getenv("SENTINEL_LIMIT_INITIAL", "8"))
+LIMIT_MIN = float(os.getenv("SENTINEL_LIMIT_MIN", "1"))
+LIMIT_MAX = float(os.getenv("SENTINEL_LIMIT_MAX", "64"))
+# Multiplicative decrease on a 429, and on latency above tolerance x baseline
+LIMIT_BACKOFF_THROTTLED = float(os.getenv("SENTINEL_LIMIT_BACKOFF_THROTTLED", "0.5"))
+LIMIT_BACKOFF_SLOW = float(os.getenv("SENTINEL_LIMIT_BACKOFF_SLOW", "0.9"))
+LIMIT_LATENCY_TOLERANCE = float(os.getenv("SENTINEL_LIMIT_LATENCY_TOLERANCE", "2.0"))
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("SENTINEL_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("SENTINEL_BREAKER_OPEN_SECONDS", "30"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the breaker is open (not retryable)."""
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for upstream calls.
+    Every successful call under the latency baseline grows the limit by
+    1/limit (about +1 per round trip); a 429 halves it and a slow call
+    trims it. Callers above the limit wait in FIFO order.
+    """
+
+    def __init__(self,
+                 initial: float = LIMIT_INITIAL,
+                 min_limit: float = LIMIT_MIN,
+                 max_limit: float = LIMIT_MAX,
+                 tolerance: float = LIMIT_LATENCY_TOLERANCE):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.baseline_ms = None
+        self._waiters = deque()
+
+    async def acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Slot handed over just before cancellation: pass it on
+                self._release_slot()
+            elif fut in self._waiters:
+                self._waiters.remove(fut)
+            raise
+
+    def release(self, latency_ms: float, throttled: bool = False, failed: bool = False):
+        if throttled:
+            self._set_limit(self.limit * LIMIT_BACKOFF_THROTTLED)
+        elif not failed:
+            # Slow EWMA of healthy latency is the baseline for "too slow"
+            if self.baseline_ms is None:
+                self.baseline_ms = latency_ms
+            else:
+                self.baseline_ms += 0.05 * (latency_ms - self.baseline_ms)
+            if latency_ms > self.baseline_ms * self.tolerance:
+                self._set_limit(self.limit * LIMIT_BACKOFF_SLOW)
+            else:
+                self._set_limit(self.limit + 1.0 / self.limit)
+        self._release_slot()
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        # Hand every free slot straight to a live waiter: after the limit
+        # grows there can be several per release
+        while self._waiters and self.in_flight < int(self.limit):
+            fut = self._waiters.popleft()
+            if fut.done() or fut.get_loop().is_closed():
+                continue
+            self.in_flight += 1
+            fut.get_loop().call_soon_threadsafe(self._wake, fut)
+
+    def _wake(self, fut):
+        if fut.done():
+            # Waiter was cancelled after the hand-over was scheduled
+            self._release_slot()
+        else:
+            fut.set_result(None)
+
+    def _set_limit(self, value: float):
+        self.limit = min(self.max_limit, max(self.min_limit, value))
+        self._wake_waiters()
+        metrics.gauge("sentinel.llm.concurrency_limit", int(self.limit))
+        metrics.gauge("sentinel.llm.inflight", self.in_flight)
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "baseline_ms": round(self.baseline_ms, 1) if self.baseline_ms else None,
+        }
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. After `threshold` upstream failures
+    it opens for `open_seconds`, then lets a single probe through (half-open);
+    the probe's outcome closes or re-opens it.
+    """
+
+    def __init__(self,
+                 threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 open_seconds: float = BREAKER_OPEN_SECONDS):
+        self.threshold = threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self, tags: list = None) -> bool:
+        """
+        Raise CircuitOpenError when the call must fail fast. Returns True
+        when this call is the half-open probe; the caller must then report
+        its outcome, or release_probe() if it never reaches upstream.
+        """
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self._set_state(HALF_OPEN)
+        if self.state == CLOSED:
+            return False
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        metrics.increment("sentinel.llm.circuit_open", tags=tags)
+        retry_in = max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(f"Circuit open: upstream failing, retry in {retry_in:.0f}s")
+
+    def record_success(self):
+        self.failures = 0
+        self._probe_in_flight = False
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def release_probe(self):
+        """The probe was shed, cancelled or timed out: let the next call probe instead."""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        self.state = state
+        metrics.gauge("sentinel.llm.circuit_state", _STATE_GAUGE[state])
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+limiter = AdaptiveLimiter()
+breaker = CircuitBreaker()
@@ -1,9 +1,6 @@
 import time
 import os
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
-from ddtrace import tracer  
+import asyncio
 from tenacity import (
     retry,
     wait_random_exponential,
@@ -13,15 +10,53 @@ from tenacity import (
 
 try:
     from app.telemetry import record_metrics
+    from app import rules
+    from app.cache import response_cache, cache_key, CACHE_ENDPOINTS
+    from app.coalesce import inflight, COALESCE_ENABLED
+    from app.limiter import limiter, breaker, CircuitOpenError
+    from app.admission import admission, AdmissionRejected
+    from app.router import router
+    from app.hedge import hedger
+    from app.deadline import DeadlineExceeded, stop_before_deadline, remaining_seconds, record_cancelled
+    from app.tokens import estimator, TokenBudgetExceeded
+    from app.stages import stage, timed
+    from app.startup import tracer
+    from app.output_scanner import OutputScanner, CUTOFF_TEXT
+    from app.backends import create_backend
 except ImportError:
     from telemetry import record_metrics
-
-load_dotenv()
+    import rules
+    from cache import response_cache, cache_key, CACHE_ENDPOINTS
+    from coalesce import inflight, COALESCE_ENABLED
+    from limiter import limiter, breaker, CircuitOpenError
+    from admission import admission, AdmissionRejected
+    from router import router
+    from hedge import hedger
+    from deadline import DeadlineExceeded, stop_before_deadline, remaining_seconds, record_cancelled
+    from tokens import estimator, TokenBudgetExceeded
+    from stages import stage, timed
+    from startup import tracer
+    from output_scanner import OutputScanner, CUTOFF_TEXT
+    from backends import create_backend
 
 # Configuration
-MODEL_ID = "gemini-2.0-flash"
+# Primary model; the SLO router may fall back to the others in SENTINEL_MODELS
+MODEL_ID = router.primary
+SUPPORT_SYSTEM_INSTRUCTION = "You are a helpful Customer Support assistant for LLM Sentinel."
+BATCH_CONCURRENCY = int(os.getenv("SENTINEL_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("SENTINEL_BATCH_MAX_ITEMS", "1000"))
+
+# Generation settings shared by every call (also part of the cache key)
+GENERATION_SETTINGS = {
+    "temperature": 0.7,
+    "safety_settings": [
+        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_ONLY_HIGH"},
+        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_ONLY_HIGH"},
+    ],
+}
 
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+# Upstream model backend: Gemini, or the local mock (SENTINEL_BACKEND=mock)
+backend = create_backend()
 
 # Helpers
 def is_retryable_error(exception: Exception) -> bool:
@@ -29,36 +64,175 @@ def is_retryable_error(exception: Exception) -> bool:
     Only retry on Rate Limits (429) or Server Errors (500).
     Do NOT retry on 403 (Leaked Key) or 400 (Bad Request).
     """
+    if isinstance(exception, (CircuitOpenError, AdmissionRejected, DeadlineExceeded)):
+        return False
     exc_str = str(exception).upper()
     return "429" in exc_str or "RESOURCE_EXHAUSTED" in exc_str or "500" in exc_str
 
+def _build_config(system_instr: str = None) -> dict:
+    # Plain dict (validated by the SDK) so importing google.genai waits for the client
+    return {
+        "system_instruction": system_instr,
+        "temperature": GENERATION_SETTINGS["temperature"],
+        "safety_settings": [dict(setting) for setting in GENERATION_SETTINGS["safety_settings"]],
+    }
+
+@timed("upstream_queue")
+async def _acquire_upstream(endpoint: str, span=None, model: str = MODEL_ID):
+    """
+    Fail fast while upstream is known to be down, then queue for admission
+    (weighted by endpoint class, may shed) and take a concurrency slot.
+    """
+    probe = breaker.allow(tags=[f"model:{model}"])
+    try:
+        queue_ms = await admission.acquire(endpoint)
+    except BaseException:
+        # Shed, cancelled or out of time before reaching upstream
+        if probe:
+            breaker.release_probe()
+        raise
+    if span is not None:
+        span.set_tag("sentinel.queue_wait_ms", round(queue_ms, 1))
+    try:
+        await limiter.acquire()
+    except BaseException:
+        admission.release()
+        if probe:
+            breaker.release_probe()
+        raise
+    return time.monotonic(), probe
+
+def _release_upstream(start: float, exc: BaseException = None, model: str = MODEL_ID,
+                      probe: bool = False):
+    """Feed the outcome of one upstream attempt back to the limiter, breaker and router."""
+    latency_ms = (time.monotonic() - start) * 1000
+    admission.release(latency_ms if exc is None else None)
+    if exc is None:
+        limiter.release(latency_ms)
+        breaker.record_success()
+        router.record(model, latency_ms)
+        hedger.record(model, latency_ms)
+    elif isinstance(exc, (asyncio.CancelledError, GeneratorExit)):
+        limiter.release(0, failed=True)
+        # An abandoned call says nothing about upstream health; only the
+        # probe itself may free the half-open probe slot
+        if probe:
+            breaker.release_probe()
+    else:
+        router.record(model, latency_ms, error=is_retryable_error(exc))
+        exc_str = str(exc).upper()
+        limiter.release(
+            latency_ms,
+            throttled="429" in exc_str or "RESOURCE_EXHAUSTED" in exc_str,
+            failed=True
+        )
+        if is_retryable_error(exc):
+            breaker.record_failure()
+        else:
+            # 4xx means upstream is healthy and rejected us
+            breaker.record_success()
+
+async def _generate_once(final_prompt: str, config, endpoint: str, model: str,
+                         span=None, started: asyncio.Event = None):
+    """One upstream attempt holding its own admission and concurrency slot."""
+    start, probe = await _acquire_upstream(endpoint, span, model)
+    if started is not None:
+        started.set()
+    try:
+        with stage("upstream_attempt"):
+            response = await backend.generate(model, final_prompt, config)
+    except BaseException as e:
+        _release_upstream(start, e, model, probe)
+        raise
+    _release_upstream(start, model=model, probe=probe)
+    return response
+
+async def _generate_hedged(final_prompt: str, config, endpoint: str, model: str, span):
+    """
+    Tail-latency hedge: once the first attempt has held its slot for longer
+    than the model's rolling p95 (and the hedge budget allows), send one
+    duplicate and keep whichever answers first. The other is cancelled,
+    which releases its slot.
+    """
+    tags = [f"model:{model}", f"endpoint:{endpoint}"]
+    delay_ms = hedger.delay_ms(model)
+    started = asyncio.Event()
+    primary = asyncio.create_task(_generate_once(final_prompt, config, endpoint, model, span, started))
+    tasks = {primary}
+    try:
+        if delay_ms is None:
+            return await primary
+        # The delay counts from when the first attempt got its slot, not from queueing
+        starter = asyncio.ensure_future(started.wait())
+        await asyncio.wait({primary, starter}, return_when=asyncio.FIRST_COMPLETED)
+        starter.cancel()
+        if not primary.done():
+            await asyncio.wait({primary}, timeout=delay_ms / 1000)
+        if primary.done() or not hedger.try_spend(tags):
+            return await primary
+
+        span.set_tag("sentinel.hedged", True)
+        hedge = asyncio.create_task(_generate_once(final_prompt, config, endpoint, model))
+        tasks.add(hedge)
+        errors = {}
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        hedger.record_win(tags)
+                        span.set_tag("sentinel.hedge_won", True)
+                    return task.result()
+                errors[task] = task.exception()
+        # Both failed: report the first attempt's error so retry rules apply as usual
+        raise errors.get(primary) or errors[hedge]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def _backoff_sleep(seconds: float):
+    with stage("retry_backoff"):
+        await asyncio.sleep(seconds)
+
 @retry(
     wait=wait_random_exponential(min=1, max=10),
-    stop=stop_after_attempt(2),
+    sleep=_backoff_sleep,
+    # No retry that could not finish inside the request deadline
+    stop=stop_after_attempt(2) | stop_before_deadline(),
     retry=retry_if_exception(is_retryable_error),
 )
-async def _send_with_retry(final_prompt: str, system_instr: str = None):
-    config = types.GenerateContentConfig(
-        system_instruction=system_instr,
-        temperature=0.7,
-        safety_settings=[
-            types.SafetySetting(category='HARM_CATEGORY_HARASSMENT', threshold='BLOCK_ONLY_HIGH'),
-            types.SafetySetting(category='HARM_CATEGORY_HATE_SPEECH', threshold='BLOCK_ONLY_HIGH'),
-        ]
-    )
+async def _send_with_retry(final_prompt: str, system_instr: str = None, rules_version: str = None,
+                           endpoint: str = "chat", model: str = MODEL_ID, route_reason: str = "primary",
+                           deadline: float = None):
+    config = _build_config(system_instr)
     
     # DATADOG TRACING BLOCK
     with tracer.trace("vertexai.request", service="llm-sentinel") as span:
         span.set_tag("llm.provider", "google")
-        span.set_tag("llm.model", MODEL_ID)
+        span.set_tag("llm.backend", backend.name)
+        span.set_tag("llm.model", model)
+        span.set_tag("sentinel.route_reason", route_reason)
         span.set_tag("llm.prompt_length", len(final_prompt))
+        span.set_tag("sentinel.rules_version", rules_version or rules.active().version)
         
         try:
-            response = await client.aio.models.generate_content(
-                model=MODEL_ID,
-                contents=final_prompt,
-                config=config
-            )
+            remaining = remaining_seconds(deadline)
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded("Deadline exceeded before the call was sent")
+            # Queueing and the call itself both count against the deadline.
+            # A coalesced call has no single deadline: each waiter enforces its
+            # own and the call is cancelled once the last of them gives up.
+            try:
+                async with asyncio.timeout(None if callable(deadline) else remaining) as budget:
+                    if hedger.enabled(endpoint):
+                        response = await _generate_hedged(final_prompt, config, endpoint, model, span)
+                    else:
+                        response = await _generate_once(final_prompt, config, endpoint, model, span)
+            except TimeoutError:
+                if not budget.expired():
+                    raise
+                raise DeadlineExceeded("Deadline exceeded before upstream answered")
+            span.set_tag("sentinel.concurrency_limit", int(limiter.limit))
             
             if response and response.text:
                 span.set_tag("llm.response_length", len(response.text))
@@ -70,19 +244,69 @@ async def _send_with_retry(final_prompt: str, system_instr: str = None):
             span.set_tag("error.msg", str(e))
             raise e
 
+async def _stream_upstream(final_prompt: str, system_instr: str = None, rules_version: str = None,
+                           endpoint: str = "chat", model: str = MODEL_ID, route_reason: str = "primary",
+                           deadline: float = None):
+    """
+    Single-attempt streaming call (a half-sent stream cannot be retried).
+    Holds one concurrency slot until the stream ends or the consumer goes away.
+    The deadline bounds the wait for a slot; once streaming, the client is
+    reading and a disconnect closes the stream instead.
+    """
+    config = _build_config(system_instr)
+
+    with tracer.trace("vertexai.stream", service="llm-sentinel") as span:
+        span.set_tag("llm.provider", "google")
+        span.set_tag("llm.backend", backend.name)
+        span.set_tag("llm.model", model)
+        span.set_tag("sentinel.route_reason", route_reason)
+        span.set_tag("llm.prompt_length", len(final_prompt))
+        span.set_tag("sentinel.rules_version", rules_version or rules.active().version)
+
+        try:
+            try:
+                async with asyncio.timeout(remaining_seconds(deadline)) as budget:
+                    start, probe = await _acquire_upstream(endpoint, span, model)
+            except TimeoutError:
+                if not budget.expired():
+                    raise
+                raise DeadlineExceeded("Deadline exceeded waiting for an upstream slot")
+            try:
+                async for chunk in backend.stream(model, final_prompt, config):
+                    yield chunk
+            except BaseException as e:
+                _release_upstream(start, e, model, probe)
+                raise
+            _release_upstream(start, model=model, probe=probe)
+
+        except Exception as e:
+            span.set_tag("error", True)
+            span.set_tag("error.msg", str(e))
+            raise e
+
+def _preflight(prompt: str, system_instr: str, model: str, endpoint: str, usage: dict):
+    """Token / projected-cost budget check; returns the rejection message, or None to go ahead."""
+    try:
+        usage.update(estimator.preflight(model, prompt, system_instr,
+                                         tags=[f"model:{model}", f"endpoint:{endpoint}"]))
+        return None
+    except TokenBudgetExceeded as e:
+        usage.update(
+            input_tokens_estimated=e.estimated_tokens,
+            projected_cost_usd=round(e.projected_cost, 6),
+            preflight_rejected=e.reason
+        )
+        return f"Request Too Large: {e}"
+
 # AI Fraud and Policy Checker
-def analyze_prompt(prompt: str) -> dict:
-    prompt_lower = prompt.lower()
-    injection_keywords = ["ignore previous instructions", "system prompt", "dan mode", "jailbreak"]
-    is_injection = any(k in prompt_lower for k in injection_keywords)
-    
-    sensitive_patterns = ["ssn", "credit card", "password", "api key", "secret_key"]
-    found_sensitive = [k for k in sensitive_patterns if k in prompt_lower]
+# Keyword lists live in the versioned rulebook (app/rulebook.json) and are
+# hot-swapped by app.rules; every category is found in one pass.
+def _security_result(hits: dict, rules_version: str) -> dict:
+    is_injection = "injection" in hits
+    found_sensitive = hits.get("sensitive_data_leak", [])
     is_sensitive = len(found_sensitive) > 0
-    
-    fraud_keywords = ["fake identity", "bank hack", "social security"]
-    is_fraud = any(k in prompt_lower for k in fraud_keywords)
-    
+    is_fraud = "fraud" in hits
+
     risk_level = "low"
     category = "clean"
     
@@ -101,13 +325,37 @@ def analyze_prompt(prompt: str) -> dict:
         "policy_violation": is_fraud or is_sensitive,
         "sensitive_data_found": found_sensitive,
         "risk": risk_level,
-        "category": category
+        "category": category,
+        "rules_version": rules_version
     }
 
+@timed("security_scan")
+def analyze_prompt(prompt: str) -> dict:
+    book = rules.active()
+    return _security_result(book.policy.scan(prompt), book.version)
+
+@timed("security_scan")
+def analyze_prompts(prompts: list[str]) -> list[dict]:
+    """Batch variant of analyze_prompt: one scan over the whole batch."""
+    book = rules.active()
+    return [_security_result(hits, book.version) for hits in book.policy.scan_many(prompts)]
+
 # Main Sentinel Logic
-async def call_gemini(prompt: str, is_support_chat: bool = False):
-    security_result = analyze_prompt(prompt)
-    usage = {"model": MODEL_ID, "input_tokens": 0, "output_tokens": 0}
+async def call_gemini(prompt: str, is_support_chat: bool = False, security_result: dict = None,
+                      deadline: float = None):
+    # Batch callers pass the verdict from their single analyze_prompts pass
+    if security_result is None:
+        security_result = analyze_prompt(prompt)
+    endpoint = "support" if is_support_chat else "chat"
+    usage = {
+        "model": MODEL_ID,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "rules_version": security_result["rules_version"]
+    }
+    system_instr = SUPPORT_SYSTEM_INSTRUCTION if is_support_chat else None
+    # Local estimate for every request, blocked ones included
+    usage["input_tokens_estimated"] = estimator.estimate_input(MODEL_ID, prompt, system_instr)
 
     if security_result["risk"] == "high":
         response_text = f"Access Denied: Your request violates our safety policy ({security_result['category']})."
@@ -116,26 +364,135 @@ async def call_gemini(prompt: str, is_support_chat: bool = False):
             response=response_text,
             usage=usage,
             security=security_result,
+            endpoint=endpoint,
             latency_ms=0,
             error=False
         )
         return response_text, usage, trace_id
 
-    system_instr = "You are a helpful Customer Support assistant for LLM Sentinel." if is_support_chat else None
+    model, route_reason = router.choose()
+    usage.update(model=model, route_reason=route_reason)
+    rejected = _preflight(prompt, system_instr, model, endpoint, usage)
+    if rejected:
+        trace_id = record_metrics(
+            prompt=prompt,
+            response=rejected,
+            usage=usage,
+            security=security_result,
+            endpoint=endpoint,
+            latency_ms=0,
+            error=False
+        )
+        return rejected, usage, trace_id
+
     start_time = time.time()
     response_text = ""
     error = False
 
+    # Exact-match response cache (FAQ-style support traffic)
+    key = None
+    if endpoint in CACHE_ENDPOINTS:
+        key = cache_key(prompt, system_instr, model, GENERATION_SETTINGS)
+        cached = response_cache.get(key, tags=[f"model:{model}", f"endpoint:{endpoint}"])
+        if cached is not None:
+            response_text, cached_usage = cached
+            # No upstream tokens were spent on a hit
+            usage.update(model=cached_usage.get("model", model), cache_hit=True)
+            trace_id = record_metrics(
+                prompt=prompt,
+                response=response_text,
+                usage=usage,
+                security=security_result,
+                endpoint=endpoint,
+                latency_ms=int((time.time() - start_time) * 1000),
+                error=False,
+                cache_hit=True
+            )
+            return response_text, usage, trace_id
+
     try:
-        response = await _send_with_retry(prompt, system_instr=system_instr)
+        send = lambda call_deadline: _send_with_retry(
+            prompt,
+            system_instr=system_instr,
+            rules_version=security_result["rules_version"],
+            endpoint=endpoint,
+            model=model,
+            route_reason=route_reason,
+            deadline=call_deadline
+        )
+        if COALESCE_ENABLED:
+            # Identical concurrent prompts share one upstream call, which runs
+            # until the latest of the waiters' deadlines
+            response, shared = await inflight.do(
+                (prompt, system_instr, model), send,
+                tags=[f"model:{model}", f"endpoint:{endpoint}"],
+                deadline=deadline
+            )
+            if shared:
+                usage["coalesced"] = True
+        else:
+            response = await send(deadline)
         if response and response.text:
-            response_text = response.text
+            # Response-side PII / secret check before anything leaves the gateway
+            scanner = OutputScanner(tags=[f"model:{model}", f"endpoint:{endpoint}"])
+            with stage("output_scan"):
+                response_text = scanner.scan_text(response.text)
+            if scanner.cut_off:
+                response_text += CUTOFF_TEXT
+            if scanner.violations:
+                usage["output_violations"] = scanner.violations
         else:
             response_text = "Safety filter triggered: Response blocked by Google."
 
-        if response.usage_metadata:
+        # Followers of a coalesced call spent no tokens of their own
+        if response.usage_metadata and not usage.get("coalesced"):
             usage["input_tokens"] = response.usage_metadata.prompt_token_count or 0
             usage["output_tokens"] = response.usage_metadata.candidates_token_count or 0
+            estimator.calibrate(model, prompt, system_instr, response.text or "",
+                                usage["input_tokens"], usage["output_tokens"])
+
+        # Only cache real answers, never safety-filtered or failed ones
+        if key is not None and response and response.text:
+            response_cache.put(key, response_text, usage, tags=[f"model:{model}", f"endpoint:{endpoint}"])
+
+    except CircuitOpenError as e:
+        # Distinct fast-fail response: nothing was sent upstream
+        error = True
+        usage["circuit_open"] = True
+        response_text = "Service temporarily unavailable (Circuit Open)."
+        print(f"🚨 SENTINEL ALERT: {e}")
+
+    except AdmissionRejected as e:
+        # Shed under overload: nothing was sent upstream, the client should back off
+        error = True
+        usage["shed"] = True
+        usage["retry_after"] = e.retry_after
+        response_text = "Service overloaded, please retry shortly."
+        print(f"🚨 SENTINEL ALERT: {e}")
+
+    except DeadlineExceeded as e:
+        # The client's time budget ran out; the upstream call was abandoned
+        error = True
+        usage["deadline_exceeded"] = True
+        response_text = "Request deadline exceeded before the model answered."
+        record_cancelled(endpoint, "deadline", (time.time() - start_time) * 1000)
+        print(f"🚨 SENTINEL ALERT: {e}")
+
+    except asyncio.CancelledError:
+        # Client went away mid-call: log what was abandoned, then let the cancellation through
+        usage["cancelled"] = True
+        latency_ms = int((time.time() - start_time) * 1000)
+        record_cancelled(endpoint, "client_disconnect", latency_ms)
+        record_metrics(
+            prompt=prompt,
+            response="",
+            usage=usage,
+            security=security_result,
+            endpoint=endpoint,
+            latency_ms=latency_ms,
+            error=False
+        )
+        raise
 
     except Exception as e:
         error = True
@@ -148,15 +505,221 @@ async def call_gemini(prompt: str, is_support_chat: bool = False):
         print(f"🚨 SENTINEL ALERT: {error_msg}")
 
     latency_ms = int((time.time() - start_time) * 1000)
-
+    if error:
+        usage["error"] = True
 
     trace_id = record_metrics(
         prompt=prompt,
         response=response_text,
         usage=usage,
         security=security_result,
+        endpoint=endpoint,
         latency_ms=latency_ms,
         error=error
     )
 
     return response_text, usage, trace_id
+
+# Batch Sentinel Logic
+async def iter_gemini_batch(prompts: list[str],
+                            is_support_chat: bool = False,
+                            concurrency: int = BATCH_CONCURRENCY,
+                            deadline: float = None):
+    """
+    Runs a batch with one security pass over all prompts, then fans the
+    allowed ones out with at most `concurrency` upstream calls in flight.
+    Yields (index, response_text, usage, trace_id, exception) as items
+    complete; blocked prompts never wait for a slot.
+    """
+    verdicts = analyze_prompts(prompts)
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(index: int):
+        prompt, verdict = prompts[index], verdicts[index]
+        try:
+            if verdict["risk"] == "high":
+                return (index, *await call_gemini(prompt, is_support_chat, security_result=verdict, deadline=deadline), None)
+            async with slots:
+                return (index, *await call_gemini(prompt, is_support_chat, security_result=verdict, deadline=deadline), None)
+        except Exception as e:
+            return index, None, None, None, e
+
+    tasks = [asyncio.create_task(run(i)) for i in range(len(prompts))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Consumer went away: stop whatever has not started yet
+        for task in tasks:
+            task.cancel()
+
+async def call_gemini_batch(prompts: list[str],
+                            is_support_chat: bool = False,
+                            concurrency: int = BATCH_CONCURRENCY,
+                            deadline: float = None) -> list:
+    """Ordered variant of iter_gemini_batch."""
+    results = [None] * len(prompts)
+    async for item in iter_gemini_batch(prompts, is_support_chat, concurrency, deadline):
+        results[item[0]] = item
+    return results
+
+# Streaming Sentinel Logic
+async def stream_gemini(prompt: str, is_support_chat: bool = False, deadline: float = None):
+    """
+    Async generator of stream events for the SSE endpoints:
+    {"event": "blocked" | "chunk" | "error" | "done", ...}.
+    The security pre-check runs before anything is sent upstream.
+    """
+    security_result = analyze_prompt(prompt)
+    endpoint = "support" if is_support_chat else "chat"
+    usage = {
+        "model": MODEL_ID,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "rules_version": security_result["rules_version"]
+    }
+    system_instr = SUPPORT_SYSTEM_INSTRUCTION if is_support_chat else None
+    # Local estimate for every request, blocked ones included
+    usage["input_tokens_estimated"] = estimator.estimate_input(MODEL_ID, prompt, system_instr)
+
+    if security_result["risk"] == "high":
+        response_text = f"Access Denied: Your request violates our safety policy ({security_result['category']})."
+        trace_id = record_metrics(
+            prompt=prompt,
+            response=response_text,
+            usage=usage,
+            security=security_result,
+            endpoint=endpoint,
+            latency_ms=0,
+            error=False
+        )
+        yield {"event": "blocked", "message": response_text, "trace_id": trace_id, "usage": usage}
+        return
+
+    model, route_reason = router.choose()
+    usage.update(model=model, route_reason=route_reason)
+    rejected = _preflight(prompt, system_instr, model, endpoint, usage)
+    if rejected:
+        trace_id = record_metrics(
+            prompt=prompt,
+            response=rejected,
+            usage=usage,
+            security=security_result,
+            endpoint=endpoint,
+            latency_ms=0,
+            error=False
+        )
+        yield {"event": "error", "message": rejected}
+        yield {"event": "done", "trace_id": trace_id, "usage": usage, "response": rejected}
+        return
+
+    scanner = OutputScanner(tags=[f"model:{model}", f"endpoint:{endpoint}"])
+    start = time.monotonic()
+    ttft_ms = None
+    inter_chunk_ms = []
+    last_chunk_at = None
+    parts = []
+    error = False
+    upstream = _stream_upstream(
+        prompt,
+        system_instr=system_instr,
+        rules_version=security_result["rules_version"],
+        endpoint=endpoint,
+        model=model,
+        route_reason=route_reason,
+        deadline=deadline
+    )
+
+    try:
+        async for chunk in upstream:
+            # Usage totals are cumulative; the last chunk carries the final count
+            if chunk.usage_metadata:
+                usage["input_tokens"] = chunk.usage_metadata.prompt_token_count or 0
+                usage["output_tokens"] = chunk.usage_metadata.candidates_token_count or 0
+
+            text = chunk.text
+            if not text:
+                continue
+            now = time.monotonic()
+            if ttft_ms is None:
+                ttft_ms = (now - start) * 1000
+            else:
+                inter_chunk_ms.append((now - last_chunk_at) * 1000)
+            last_chunk_at = now
+
+            # Incremental output scan; a short tail is held back per chunk
+            safe = scanner.feed(text)
+            if safe:
+                parts.append(safe)
+                yield {"event": "chunk", "text": safe}
+            if scanner.cut_off:
+                parts.append(CUTOFF_TEXT)
+                yield {"event": "cutoff", "text": CUTOFF_TEXT}
+                break
+
+        tail = scanner.finish()
+        if tail:
+            parts.append(tail)
+            yield {"event": "chunk", "text": tail}
+
+        if ttft_ms is None:
+            parts.append("Safety filter triggered: Response blocked by Google.")
+            yield {"event": "chunk", "text": parts[0]}
+        elif usage["output_tokens"] and not scanner.cut_off:
+            estimator.calibrate(model, prompt, system_instr, "".join(parts),
+                                usage["input_tokens"], usage["output_tokens"])
+
+    except CircuitOpenError as e:
+        error = True
+        usage["circuit_open"] = True
+        parts.append("Service temporarily unavailable (Circuit Open).")
+        print(f"🚨 SENTINEL ALERT: {e}")
+        yield {"event": "error", "message": parts[-1]}
+
+    except AdmissionRejected as e:
+        error = True
+        usage["shed"] = True
+        usage["retry_after"] = e.retry_after
+        parts.append("Service overloaded, please retry shortly.")
+        print(f"🚨 SENTINEL ALERT: {e}")
+        yield {"event": "error", "message": parts[-1]}
+
+    except DeadlineExceeded as e:
+        error = True
+        usage["deadline_exceeded"] = True
+        parts.append("Request deadline exceeded before the model answered.")
+        record_cancelled(endpoint, "deadline", (time.monotonic() - start) * 1000)
+        print(f"🚨 SENTINEL ALERT: {e}")
+        yield {"event": "error", "message": parts[-1]}
+
+    except (asyncio.CancelledError, GeneratorExit):
+        # Consumer went away mid-stream (client disconnect)
+        usage["cancelled"] = True
+        record_cancelled(endpoint, "client_disconnect", (time.monotonic() - start) * 1000)
+        raise
+
+    except Exception as e:
+        error = True
+        parts.append("Service temporarily unavailable (Inference Failure).")
+        print(f"🚨 SENTINEL ALERT: {e}")
+        yield {"event": "error", "message": parts[-1]}
+
+    finally:
+        # Runs on completion, failure, cut-off and client disconnect alike;
+        # closing the upstream generator releases its concurrency slot right away
+        await upstream.aclose()
+        if scanner.violations:
+            usage["output_violations"] = scanner.violations
+        trace_id = record_metrics(
+            prompt=prompt,
+            response="".join(parts),
+            usage=usage,
+            security=security_result,
+            endpoint=endpoint,
+            latency_ms=int((time.monotonic() - start) * 1000),
+            error=error,
+            ttft_ms=ttft_ms,
+            inter_chunk_ms=inter_chunk_ms
+        )
+
+    yield {"event": "done", "trace_id": trace_id, "usage": usage, "response": "".join(parts)}
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from app.metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Configuration
+LOG_PATH = os.getenv("SENTINEL_LOG_PATH", os.path.join(BASE_DIR, "logs", "requests.jsonl"))
+LOG_MAX_BYTES = int(os.getenv("SENTINEL_LOG_MAX_BYTES", str(64 * 1024 * 1024)))
+LOG_ROTATE_SECONDS = float(os.getenv("SENTINEL_LOG_ROTATE_SECONDS", "3600"))
+LOG_BACKUP_COUNT = int(os.getenv("SENTINEL_LOG_BACKUP_COUNT", "24"))
+LOG_QUEUE_SIZE = int(os.getenv("SENTINEL_LOG_QUEUE_SIZE", "10000"))
+# Prompt/response text beyond this many characters is cut from the record
+LOG_MAX_FIELD_CHARS = int(os.getenv("SENTINEL_LOG_MAX_FIELD_CHARS", "4096"))
+# Also echo request records to stderr (from the writer thread)
+LOG_CONSOLE = os.getenv("SENTINEL_LOG_CONSOLE", "false").lower() == "true"
+
+_CAPPED_FIELDS = ("prompt", "response")
+
+
+def _dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+    return json.dumps(obj, default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+def cap_fields(entry: dict, limit: int = LOG_MAX_FIELD_CHARS) -> dict:
+    """Copy of `entry` with long prompt/response text truncated."""
+    capped = None
+    for field in _CAPPED_FIELDS:
+        text = entry.get(field)
+        if isinstance(text, str) and len(text) > limit:
+            if capped is None:
+                capped = dict(entry)
+            capped[field] = text[:limit]
+            capped[f"{field}_truncated_chars"] = len(text) - limit
+    return capped or entry
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line. Dict messages are written as-is (capped)."""
+
+    def __init__(self, max_field_chars: int = LOG_MAX_FIELD_CHARS):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        if isinstance(record.msg, dict):
+            return _dumps(cap_fields(record.msg, self.max_field_chars))
+        return _dumps({
+            "timestamp": int(record.created),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        })
+
+
+class SizeTimeRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotates when the file passes `maxBytes` or is older than `interval`
+    seconds, whichever comes first. Writes are not flushed per record;
+    the listener flushes once the queue drains.
+    """
+
+    def __init__(self, filename: str, maxBytes: int, backupCount: int, interval: float):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount,
+                         encoding="utf-8", delay=True)
+        self.interval = interval
+        self.opened_at = time.time()
+
+    def shouldRollover(self, record) -> bool:
+        if self.stream is None:
+            return False
+        if self.interval > 0 and time.time() - self.opened_at >= self.interval:
+            return True
+        # Size check on the current offset: no second format() of the record
+        return self.maxBytes > 0 and self.stream.tell() >= self.maxBytes
+
+    def doRollover(self):
+        super().doRollover()
+        self.opened_at = time.time()
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+                self.opened_at = time.time()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Non-blocking enqueue for the request path. The record is passed through
+    untouched (formatting happens on the writer thread); a full queue drops
+    the record and counts it instead of blocking or raising.
+    """
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+            metrics.increment("sentinel.log.dropped")
+        metrics.gauge("sentinel.log.queue_depth", self.queue.qsize())
+
+
+class BatchingQueueListener(QueueListener):
+    """Writes records as they arrive and flushes handlers when the queue runs dry."""
+
+    def __init__(self, q: queue.Queue, *handlers):
+        super().__init__(q, *handlers, respect_handler_level=False)
+        self.written = 0
+
+    def enqueue_sentinel(self):
+        # Blocking put: stop() must get through even when the queue is full
+        self.queue.put(self._sentinel)
+
+    def handle(self, record):
+        for handler in self.handlers:
+            handler.handle(record)
+        self.written += 1
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
+class RequestLogSink:
+    """
+    JSON Lines sink for per-request records. `logger` only enqueues; a
+    listener thread serializes and writes to size/time-rotated files.
+    """
+
+    def __init__(self,
+                 path: str = LOG_PATH,
+                 max_bytes: int = LOG_MAX_BYTES,
+                 rotate_seconds: float = LOG_ROTATE_SECONDS,
+                 backup_count: int = LOG_BACKUP_COUNT,
+                 queue_size: int = LOG_QUEUE_SIZE,
+                 max_field_chars: int = LOG_MAX_FIELD_CHARS,
+                 console: bool = LOG_CONSOLE):
+        self.path = path
+        self.queue = queue.Queue(maxsize=queue_size)
+        formatter = JsonLinesFormatter(max_field_chars)
+
+        handlers = [SizeTimeRotatingFileHandler(path, max_bytes, backup_count, rotate_seconds)]
+        if console:
+            handlers.append(logging.StreamHandler())
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        self.handler = DroppingQueueHandler(self.queue)
+        self.listener = BatchingQueueListener(self.queue, *handlers)
+        self._started = False
+
+        self.logger = logging.getLogger("llm-sentinel.requests")
+        self.logger.handlers = [self.handler]
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+
+    def log(self, entry: dict):
+        if not self._started:
+            self.start()
+        self.logger.info(entry)
+
+    def start(self):
+        if not self._started:
+            self._started = True
+            self.listener.start()
+
+    def stop(self):
+        """Drain the queue, flush and close the files."""
+        if self._started:
+            self.listener.stop()
+            self._started = False
+        for handler in self.listener.handlers:
+            handler.flush()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "enqueued": self.handler.enqueued,
+            "dropped": self.handler.dropped,
+            "written": self.listener.written,
+            "encoder": "orjson" if orjson is not None else "json",
+        }
+
+
+request_log = RequestLogSink()
+atexit.register(request_log.stop)
@@ -1,14 +1,70 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
+import asyncio
+import json
 import time
+from dotenv import load_dotenv
+
+# Settings are read when each module is imported, so .env goes first
+load_dotenv()
+
+from app.metrics import metrics
+from app.llm import (
+    call_gemini,
+    stream_gemini,
+    iter_gemini_batch,
+    call_gemini_batch,
+    BATCH_CONCURRENCY,
+    BATCH_MAX_ITEMS,
+    backend,
+)
+from app.events import dispatcher
+from app import rules
+from app.limiter import limiter, breaker
+from app.cardinality import governor
+from app.log_sink import request_log
+from app.audit_store import audit_store
+from app.ratelimit import ratelimiter, Throttled, key_id, retry_after_header, API_KEY_HEADER
+from app.admission import admission
+from app.router import router
+from app.hedge import hedger
+from app.deadline import deadline_for, DEADLINE_HEADER
+from app.tokens import estimator
+from app.stages import ServerTimingMiddleware, stage_stats, profiler, timed, DEBUG_ENDPOINTS, PROFILER_ALLOWED
+from app import startup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pick up rulebook edits without a redeploy
+    rules.watcher.start()
+    # Tracer, Datadog and the upstream client are created lazily; warm them
+    # up here so the first request after a cold start doesn't pay for it
+    warmup = None
+    if startup.WARMUP_MODE == "blocking":
+        await startup.warm_up(backend, router.primary)
+    elif startup.WARMUP_MODE == "background":
+        warmup = asyncio.create_task(startup.warm_up(backend, router.primary))
+    yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    rules.watcher.stop()
+    # Flush queued Datadog events, then the metrics they produced
+    await asyncio.to_thread(dispatcher.flush)
+    await asyncio.to_thread(request_log.stop)
+    await asyncio.to_thread(audit_store.flush)
+    await asyncio.to_thread(metrics.close)
 
-from datadog import statsd
-from app.llm import call_gemini
 
 app = FastAPI(
     title="LLM Sentinel for Vertex AI",
-    description="Enterprise AI Gateway with Fraud Detection, Policy Guardrails, and Observability"
+    description="Enterprise AI Gateway with Fraud Detection, Policy Guardrails, and Observability",
+    lifespan=lifespan
 )
+# Per-stage latency breakdown in a Server-Timing header
+app.add_middleware(ServerTimingMiddleware)
 
 # -------------------------
 # Data Models
@@ -22,11 +78,106 @@ class ChatResponse(BaseModel):
     trace_id: str
     model: str
 
+class BatchChatRequest(BaseModel):
+    prompts: list[str]
+    concurrency: int | None = None
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: str
+    response: str | None = None
+    trace_id: str | None = None
+    model: str = "unknown"
+    error: str | None = None
+
+class BatchChatResponse(BaseModel):
+    results: list[BatchItemResult]
+
+
+# -------------------------
+# Caller identity & rate limiting
+# -------------------------
+
+def caller_id(request: Request) -> str:
+    """API key (hashed) when present, else the client address."""
+    raw_key = request.headers.get(API_KEY_HEADER)
+    if raw_key:
+        return f"key:{key_id(raw_key)}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def _throttle(caller: str, cost: float = 1, allow_debt: bool = False):
+    try:
+        ratelimiter.check(caller, cost, allow_debt=allow_debt)
+    except Throttled as e:
+        raise HTTPException(
+            status_code=429,
+            detail={"message": str(e), "reason": e.reason},
+            headers={"Retry-After": retry_after_header(e.retry_after)}
+        )
+
+
+def rate_limited(request: Request) -> str:
+    caller = caller_id(request)
+    _throttle(caller)
+    return caller
+
+
+def _account(caller: str, usage: dict, blocked: bool = False):
+    """Charge real token usage to the caller; repeated violations tighten its limits."""
+    if usage:
+        ratelimiter.charge(caller, usage.get("input_tokens", 0) + usage.get("output_tokens", 0))
+    if blocked:
+        ratelimiter.record_violation(caller)
+
+
+def _unavailable(usage: dict, message: str, trace_id: str) -> HTTPException:
+    """503 for circuit-open or shed requests (shed ones say when to retry), 504 past the deadline."""
+    headers = {"Retry-After": retry_after_header(usage["retry_after"])} if usage.get("shed") else None
+    return HTTPException(
+        status_code=504 if usage.get("deadline_exceeded") else 503,
+        detail={"message": message, "trace_id": trace_id},
+        headers=headers
+    )
+
+
+# -------------------------
+# Deadlines & client disconnects
+# -------------------------
+
+def _deadline(request: Request, endpoint: str):
+    return deadline_for(endpoint, request.headers.get(DEADLINE_HEADER))
+
+
+async def _disconnected(request: Request):
+    # The body has been read by now, so the next message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _until_disconnect(request: Request, coro):
+    """Await `coro`, cancelling it (and its upstream call) if the client goes away first."""
+    work = asyncio.ensure_future(coro)
+    watcher = asyncio.ensure_future(_disconnected(request))
+    try:
+        done, _ = await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        work.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if work not in done:
+        work.cancel()
+        await asyncio.gather(work, return_exceptions=True)
+        raise HTTPException(status_code=499, detail="Client closed request")
+    return work.result()
+
 
 # -------------------------
 # Helper: emit common metrics
 # -------------------------
 
+@timed("emit_metrics")
 def emit_llm_metrics(
     *,
     model: str,
@@ -36,24 +187,27 @@ def emit_llm_metrics(
     latency_ms: float,
     usage: dict | None = None,
 ):
-    # Token counts (real if available, fallback if not)
-    prompt_tokens = usage.get("prompt_tokens") if usage else None
-    completion_tokens = usage.get("completion_tokens") if usage else None
-
-    if prompt_tokens is None:
-        prompt_tokens = len(prompt.split())
-
-    if completion_tokens is None:
-        completion_tokens = len(response.split())
+    usage = usage or {}
+    rules_version = usage.get("rules_version", "unknown")
+    tags = [f"model:{model}", f"endpoint:{endpoint}", f"rules_version:{rules_version}"]
 
-    tags = [f"model:{model}", f"endpoint:{endpoint}"]
+    # Token counts: real ones from usage_metadata when upstream answered, and
+    # the local estimate for every request, tagged apart so they can be compared
+    input_tokens = usage.get("input_tokens", 0)
+    output_tokens = usage.get("output_tokens", 0)
+    if input_tokens or output_tokens:
+        metrics.gauge("llm.tokens.prompt", input_tokens, tags=tags + ["source:real"])
+        metrics.gauge("llm.tokens.completion", output_tokens, tags=tags + ["source:real"])
 
-    statsd.increment("llm.request.count", tags=tags)
+    estimated_input = usage.get("input_tokens_estimated")
+    if estimated_input is None:
+        estimated_input = estimator.estimate_input(model, prompt)
+    metrics.gauge("llm.tokens.prompt", estimated_input, tags=tags + ["source:estimated"])
+    metrics.gauge("llm.tokens.completion", estimator.estimate_output(model, response), tags=tags + ["source:estimated"])
 
-    statsd.gauge("llm.tokens.prompt", prompt_tokens, tags=tags)
-    statsd.gauge("llm.tokens.completion", completion_tokens, tags=tags)
+    # Requests are counted once, as sentinel.llm.requests in record_metrics
 
-    statsd.histogram("llm.latency.ms", latency_ms, tags=tags)
+    metrics.histogram("llm.latency.ms", latency_ms, tags=tags)
 
 
 # -------------------------
@@ -61,13 +215,14 @@ def emit_llm_metrics(
 # -------------------------
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(req: ChatRequest):
+async def chat(req: ChatRequest, request: Request, caller: str = Depends(rate_limited)):
     start_time = time.time()
 
     try:
-        response_text, usage, trace_id = await call_gemini(
-            req.prompt, is_support_chat=False
-        )
+        response_text, usage, trace_id = await _until_disconnect(request, call_gemini(
+            req.prompt, is_support_chat=False, deadline=_deadline(request, "chat")
+        ))
+        _account(caller, usage, blocked="Access Denied" in response_text)
 
         model = usage.get("model", "unknown") if usage else "unknown"
 
@@ -82,10 +237,19 @@ async def chat(req: ChatRequest):
             usage=usage,
         )
 
+        if usage.get("circuit_open") or usage.get("shed") or usage.get("deadline_exceeded"):
+            raise _unavailable(usage, response_text, trace_id)
+
+        if usage.get("preflight_rejected"):
+            raise HTTPException(
+                status_code=413,
+                detail={"message": response_text, "trace_id": trace_id}
+            )
+
         if "Access Denied" in response_text:
-            statsd.increment(
+            metrics.increment(
                 "llm.prompt.injection",
-                tags=[f"model:{model}", "endpoint:chat"]
+                tags=[f"model:{model}", "endpoint:chat", f"rules_version:{usage.get('rules_version', 'unknown')}"]
             )
             raise HTTPException(
                 status_code=403,
@@ -99,11 +263,11 @@ async def chat(req: ChatRequest):
         )
 
     except HTTPException:
-        statsd.increment("llm.error.count", tags=["endpoint:chat"])
+        metrics.increment("llm.error.count", tags=["endpoint:chat"])
         raise
 
     except Exception as e:
-        statsd.increment("llm.error.count", tags=["endpoint:chat"])
+        metrics.increment("llm.error.count", tags=["endpoint:chat"])
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -112,13 +276,14 @@ async def chat(req: ChatRequest):
 # -------------------------
 
 @app.post("/support", response_model=ChatResponse)
-async def support_chatbot(req: ChatRequest):
+async def support_chatbot(req: ChatRequest, request: Request, caller: str = Depends(rate_limited)):
     start_time = time.time()
 
     try:
-        response_text, usage, trace_id = await call_gemini(
-            req.prompt, is_support_chat=True
-        )
+        response_text, usage, trace_id = await _until_disconnect(request, call_gemini(
+            req.prompt, is_support_chat=True, deadline=_deadline(request, "support")
+        ))
+        _account(caller, usage, blocked="Access Denied" in response_text)
 
         model = usage.get("model", "unknown") if usage else "unknown"
 
@@ -133,10 +298,19 @@ async def support_chatbot(req: ChatRequest):
             usage=usage,
         )
 
+        if usage.get("circuit_open") or usage.get("shed") or usage.get("deadline_exceeded"):
+            raise _unavailable(usage, response_text, trace_id)
+
+        if usage.get("preflight_rejected"):
+            raise HTTPException(
+                status_code=413,
+                detail={"message": response_text, "trace_id": trace_id}
+            )
+
         if "Access Denied" in response_text:
-            statsd.increment(
+            metrics.increment(
                 "llm.prompt.injection",
-                tags=[f"model:{model}", "endpoint:support"]
+                tags=[f"model:{model}", "endpoint:support", f"rules_version:{usage.get('rules_version', 'unknown')}"]
             )
             raise HTTPException(
                 status_code=403,
@@ -149,11 +323,215 @@ async def support_chatbot(req: ChatRequest):
             model=model
         )
 
+    except HTTPException:
+        metrics.increment("llm.error.count", tags=["endpoint:support"])
+        raise
+
     except Exception:
-        statsd.increment("llm.error.count", tags=["endpoint:support"])
+        metrics.increment("llm.error.count", tags=["endpoint:support"])
         raise HTTPException(status_code=500, detail="Support Bot unavailable")
 
 
+# -------------------------
+# 📦 Endpoint 3: Batch Chat
+# -------------------------
+
+def _batch_params(req: BatchChatRequest) -> int:
+    if not req.prompts:
+        raise HTTPException(status_code=422, detail="prompts must not be empty")
+    if len(req.prompts) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_ITEMS} prompts per batch")
+    # Clients may ask for less parallelism, never more than the server cap
+    return max(1, min(req.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY))
+
+
+def _batch_item(item: tuple, prompt: str, start_time: float) -> BatchItemResult:
+    index, response_text, usage, trace_id, exc = item
+    if exc is not None:
+        metrics.increment("llm.error.count", tags=["endpoint:chat_batch"])
+        return BatchItemResult(index=index, status="error", error=str(exc))
+
+    model = usage.get("model", "unknown")
+    emit_llm_metrics(
+        model=model,
+        endpoint="chat_batch",
+        prompt=prompt,
+        response=response_text,
+        latency_ms=(time.time() - start_time) * 1000,
+        usage=usage,
+    )
+
+    if "Access Denied" in response_text:
+        metrics.increment(
+            "llm.prompt.injection",
+            tags=[f"model:{model}", "endpoint:chat_batch", f"rules_version:{usage.get('rules_version', 'unknown')}"]
+        )
+        status = "blocked"
+    elif usage.get("preflight_rejected"):
+        status = "rejected"
+    elif usage.get("error"):
+        metrics.increment("llm.error.count", tags=["endpoint:chat_batch"])
+        status = "error"
+    else:
+        status = "ok"
+
+    return BatchItemResult(
+        index=index,
+        status=status,
+        response=response_text,
+        trace_id=trace_id,
+        model=model,
+        error=response_text if status in ("error", "rejected") else None
+    )
+
+
+def _batch_throttle(req: BatchChatRequest, caller: str):
+    # A batch costs one request per prompt; more than the burst puts the key
+    # into debt, so it waits as long as the prompts would have sent one by one
+    _throttle(caller, cost=len(req.prompts), allow_debt=True)
+
+
+def _batch_account(item: tuple, caller: str):
+    _, response_text, usage, _, exc = item
+    if exc is None:
+        _account(caller, usage, blocked="Access Denied" in response_text)
+
+
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(req: BatchChatRequest, request: Request, caller: str = Depends(caller_id)):
+    concurrency = _batch_params(req)
+    _batch_throttle(req, caller)
+    start_time = time.time()
+    items = await _until_disconnect(request, call_gemini_batch(
+        req.prompts, is_support_chat=False, concurrency=concurrency,
+        deadline=_deadline(request, "chat_batch")
+    ))
+    for item in items:
+        _batch_account(item, caller)
+    return BatchChatResponse(
+        results=[_batch_item(item, req.prompts[item[0]], start_time) for item in items]
+    )
+
+
+@app.post("/chat/batch/stream")
+async def chat_batch_stream(req: BatchChatRequest, request: Request, caller: str = Depends(caller_id)):
+    """NDJSON: one result line per prompt, in completion order."""
+    concurrency = _batch_params(req)
+    _batch_throttle(req, caller)
+    start_time = time.time()
+    deadline = _deadline(request, "chat_batch")
+
+    async def body():
+        results = iter_gemini_batch(req.prompts, is_support_chat=False, concurrency=concurrency,
+                                    deadline=deadline)
+        try:
+            async for item in results:
+                _batch_account(item, caller)
+                result = _batch_item(item, req.prompts[item[0]], start_time)
+                yield result.model_dump_json() + "\n"
+        finally:
+            await results.aclose()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+# -------------------------
+# 📡 Endpoint 4: Streaming (Server-Sent Events)
+# -------------------------
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_endpoint(req: ChatRequest, request: Request, endpoint: str, is_support_chat: bool, caller: str):
+    start_time = time.time()
+    events = stream_gemini(req.prompt, is_support_chat=is_support_chat, deadline=_deadline(request, endpoint))
+
+    # The security verdict (or the first chunk) decides the status code; once
+    # the response has started, StreamingResponse handles disconnects itself
+    first = await _until_disconnect(request, events.__anext__())
+    if first["event"] in ("blocked", "error"):
+        done = first if first["event"] == "blocked" else await events.__anext__()
+        await events.aclose()
+        usage = done["usage"]
+        model = usage.get("model", "unknown")
+        if first["event"] == "blocked":
+            _account(caller, usage, blocked=True)
+            emit_llm_metrics(
+                model=model,
+                endpoint=endpoint,
+                prompt=req.prompt,
+                response=first["message"],
+                latency_ms=(time.time() - start_time) * 1000,
+                usage=usage,
+            )
+            metrics.increment(
+                "llm.prompt.injection",
+                tags=[f"model:{model}", f"endpoint:{endpoint}", f"rules_version:{usage.get('rules_version', 'unknown')}"]
+            )
+            metrics.increment("llm.error.count", tags=[f"endpoint:{endpoint}"])
+            raise HTTPException(
+                status_code=403,
+                detail={"message": first["message"], "trace_id": done["trace_id"]}
+            )
+        if usage.get("circuit_open") or usage.get("shed") or usage.get("deadline_exceeded"):
+            metrics.increment("llm.error.count", tags=[f"endpoint:{endpoint}"])
+            raise _unavailable(usage, first["message"], done["trace_id"])
+        if usage.get("preflight_rejected"):
+            metrics.increment("llm.error.count", tags=[f"endpoint:{endpoint}"])
+            raise HTTPException(
+                status_code=413,
+                detail={"message": first["message"], "trace_id": done["trace_id"]}
+            )
+        # Other upstream failures are reported in-stream, like /chat does in-body
+        pending = [first, done]
+    else:
+        pending = [first]
+
+    async def body():
+        try:
+            while True:
+                event = pending.pop(0) if pending else await events.__anext__()
+                if event["event"] != "done":
+                    yield _sse(event["event"], {k: v for k, v in event.items() if k != "event"})
+                    continue
+
+                usage = event["usage"]
+                _account(caller, usage)
+                emit_llm_metrics(
+                    model=usage.get("model", "unknown"),
+                    endpoint=endpoint,
+                    prompt=req.prompt,
+                    response=event["response"],
+                    latency_ms=(time.time() - start_time) * 1000,
+                    usage=usage,
+                )
+                yield _sse("done", {
+                    "trace_id": event["trace_id"],
+                    "model": usage.get("model", "unknown"),
+                    "usage": usage
+                })
+                return
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request, caller: str = Depends(rate_limited)):
+    return await _stream_endpoint(req, request, "chat", is_support_chat=False, caller=caller)
+
+
+@app.post("/support/stream")
+async def support_stream(req: ChatRequest, request: Request, caller: str = Depends(rate_limited)):
+    return await _stream_endpoint(req, request, "support", is_support_chat=True, caller=caller)
+
+
 # -------------------------
 # Health & Root
 # -------------------------
@@ -162,9 +540,54 @@ async def support_chatbot(req: ChatRequest):
 def health_check():
     return {
         "status": "Sentinel Active",
-        "version": "2.1-LLM-Observability-Enabled"
+        "version": "2.1-LLM-Observability-Enabled",
+        "rules_version": rules.active().version,
+        "backend": backend.name,
+        "concurrency": limiter.stats(),
+        "circuit": breaker.stats(),
+        "rate_limits": ratelimiter.stats(),
+        "admission": admission.stats(),
+        "routing": router.stats(),
+        "hedging": hedger.stats(),
+        "tokens": estimator.stats(),
+        "warmup": startup.status,
+        "suppressed_tag_series": governor.suppressed_series()
     }
 
+# -------------------------
+# Debug: stage latencies & profiler
+# -------------------------
+
+def _debug_enabled():
+    if not DEBUG_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@app.get("/debug/stats", dependencies=[Depends(_debug_enabled)])
+def debug_stats():
+    """Rolling per-stage latency percentiles (SENTINEL_STAGE_WINDOW_SECONDS)."""
+    return {"stages": stage_stats.snapshot(), "profiler": profiler.stats()}
+
+
+@app.post("/debug/profiler", dependencies=[Depends(_debug_enabled)])
+def debug_profiler(enabled: bool = True):
+    if not PROFILER_ALLOWED:
+        raise HTTPException(status_code=403, detail="Profiler disabled (set SENTINEL_PROFILER_ALLOWED=1)")
+    if enabled:
+        profiler.start()
+    else:
+        profiler.stop()
+    return profiler.stats()
+
+
+@app.get("/debug/profile", dependencies=[Depends(_debug_enabled)])
+def debug_profile(limit: int = 20, folded: bool = False):
+    """Hottest sampled stacks; `folded=true` returns flamegraph.pl input."""
+    if folded:
+        return PlainTextResponse(profiler.folded())
+    return {"profiler": profiler.stats(), "stacks": profiler.top(limit)}
+
+
 @app.get("/")
 async def root():
     return {
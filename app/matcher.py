@@ -0,0 +1,142 @@
+import re
+from bisect import bisect_right
+
+_METACHARS = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+
+# Helpers
+def is_literal(pattern: str) -> bool:
+    """True when a rule has no regex metacharacters and can live in the trie."""
+    return not _METACHARS.search(pattern)
+
+
+def _build_trie(words: list[str]) -> dict:
+    root = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+    return root
+
+
+def _trie_to_regex(node: dict) -> str:
+    """
+    Render a trie as a regex where every branch point is a single alternation
+    on distinct characters, so the engine never backtracks across siblings and
+    the greedy match is always the longest keyword at a position.
+    """
+    terminal = "" in node
+    branches = [re.escape(ch) + _trie_to_regex(node[ch]) for ch in sorted(k for k in node if k)]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+    body = "(?:" + "|".join(branches) + ")"
+    return body + "?" if terminal else body
+
+
+class PatternMatcher:
+    """
+    Compiled multi-pattern engine for the security rulebook.
+
+    All literal rules across every category are folded into one trie-shaped
+    regex and found in a single pass over the lowercased text. A lookahead
+    makes the scan report the longest keyword at every offset; shorter keywords
+    at the same offset are recovered from a precomputed prefix table, so
+    overlapping rules are all reported. Non-literal regex rules (rare) are
+    kept in a small side lane and searched individually.
+    """
+
+    def __init__(self, rules: dict[str, list[str]]):
+        self.categories = list(rules)
+        self.rule_count = sum(len(p) for p in rules.values())
+        # keyword -> [(category, rule_index)], lowercased like the old scans
+        self._owners: dict[str, list[tuple[str, int]]] = {}
+        self._regex_rules: list[tuple[str, int, str, re.Pattern]] = []
+
+        for category, patterns in rules.items():
+            for idx, pattern in enumerate(patterns):
+                if is_literal(pattern):
+                    self._owners.setdefault(pattern.lower(), []).append((category, idx))
+                else:
+                    self._regex_rules.append(
+                        (category, idx, pattern, re.compile(pattern, re.IGNORECASE))
+                    )
+
+        keywords = sorted(self._owners)
+        self.max_keyword_length = max((len(k) for k in keywords), default=0)
+        self._prefixes = self._prefix_table(keywords)
+        body = _trie_to_regex(_build_trie(keywords))
+        self._regex = re.compile(f"(?=({body}))") if body else None
+        # Only used when lowercasing would shift offsets (a few non-ASCII chars)
+        self._regex_ci = re.compile(f"(?=({body}))", re.IGNORECASE) if body else None
+
+    @staticmethod
+    def _prefix_table(keywords: list[str]) -> dict[str, tuple[str, ...]]:
+        """keyword -> every keyword that is a prefix of it (itself included)."""
+        known = set(keywords)
+        return {
+            kw: tuple(kw[:i] for i in range(1, len(kw) + 1) if kw[:i] in known)
+            for kw in keywords
+        }
+
+    def categories_of(self, keyword: str) -> list[str]:
+        return [category for category, _ in self._owners.get(keyword, ())]
+
+    def finditer(self, text: str):
+        """Yield (start, end, keyword) for every literal rule occurrence."""
+        if self._regex is None:
+            return
+        prefixes = self._prefixes
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            matches = self._regex.finditer(lowered)
+        else:
+            matches = self._regex_ci.finditer(text)
+        for m in matches:
+            start = m.start()
+            longest = m.group(1).lower()
+            for kw in prefixes.get(longest, (longest,)):
+                yield start, start + len(kw), kw
+
+    def scan(self, text: str) -> dict[str, list[str]]:
+        """
+        One pass over `text`. Returns {category: [matched rules]} with rules
+        in rulebook order; categories without hits are omitted.
+        """
+        hits = {}
+        for _, _, kw in self.finditer(text):
+            for category, idx in self._owners.get(kw, ()):
+                hits.setdefault(category, {})[idx] = kw
+        for category, idx, pattern, compiled in self._regex_rules:
+            if compiled.search(text):
+                hits.setdefault(category, {})[idx] = pattern
+        return {c: [found[i] for i in sorted(found)] for c, found in hits.items()}
+
+    def scan_many(self, texts: list[str]) -> list[dict[str, list[str]]]:
+        """
+        Batch variant of `scan`: the texts are joined with a NUL separator
+        (never part of a rule) and scanned in one regex pass.
+        """
+        if not texts:
+            return []
+        if self._regex_rules or any("\0" in t for t in texts):
+            return [self.scan(t) for t in texts]
+
+        offsets = []
+        pos = 0
+        for t in texts:
+            offsets.append(pos)
+            pos += len(t) + 1
+        joined = "\0".join(texts)
+
+        results = [{} for _ in texts]
+        for start, _, kw in self.finditer(joined):
+            hits = results[bisect_right(offsets, start) - 1]
+            for category, idx in self._owners.get(kw, ()):
+                hits.setdefault(category, {})[idx] = kw
+        return [
+            {c: [found[i] for i in sorted(found)] for c, found in hits.items()}
+            for hits in results
+        ]
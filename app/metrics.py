@@ -0,0 +1,202 @@
+import os
+import random
+import socket
+import threading
+import atexit
+import logging
+
+logger = logging.getLogger("llm-sentinel")
+
+# Configuration (same agent address variables as the datadog client)
+STATSD_HOST = os.getenv("DD_AGENT_HOST", "localhost")
+STATSD_PORT = int(os.getenv("DD_DOGSTATSD_PORT", "8125"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("SENTINEL_METRICS_FLUSH_INTERVAL", "5"))
+# Safe UDP payload on a standard 1500-byte MTU
+METRICS_MAX_PACKET = int(os.getenv("SENTINEL_METRICS_MAX_PACKET", "1432"))
+# Samples kept per histogram series per interval (reservoir-sampled beyond that)
+METRICS_MAX_SAMPLES = int(os.getenv("SENTINEL_METRICS_MAX_SAMPLES", "256"))
+
+_TAG_UNSAFE = (",", "|", "#", "\n")
+
+
+def _fmt(value) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return f"{value:.6g}"
+
+
+def _join_tags(tags: tuple) -> str:
+    # Separator characters inside a tag value would corrupt the datagram
+    joined = "\0".join(tags)
+    for ch in _TAG_UNSAFE:
+        if ch in joined:
+            joined = joined.replace(ch, "_")
+    return joined.replace("\0", ",")
+
+
+class MetricsBuffer:
+    """
+    In-process pre-aggregation in front of DogStatsD.
+
+    Counters are summed, gauges keep their last value and histograms keep a
+    bounded reservoir of samples per (metric, tag set). Every flush packs all
+    series into as few UDP datagrams as possible, using the DogStatsD
+    multi-value format for histograms and a sample rate when the reservoir
+    overflowed, so the agent still sees the true counts. The request path only
+    touches a dict under a lock.
+    """
+
+    def __init__(self,
+                 host: str = STATSD_HOST,
+                 port: int = STATSD_PORT,
+                 flush_interval: float = METRICS_FLUSH_INTERVAL,
+                 max_packet: int = METRICS_MAX_PACKET,
+                 max_samples: int = METRICS_MAX_SAMPLES,
+                 sender=None):
+        self.address = (host, port)
+        self.flush_interval = flush_interval
+        self.max_packet = max_packet
+        self.max_samples = max_samples
+        self._sender = sender
+        self._socket = None
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._worker = None
+        self._stop = threading.Event()
+        self.datagrams_sent = 0
+        self.lines_sent = 0
+        self.send_errors = 0
+
+    # Hot path
+    def increment(self, name: str, value: float = 1, tags: list = None):
+        key = (name, tuple(tags) if tags else ())
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._ensure_worker()
+
+    def decrement(self, name: str, value: float = 1, tags: list = None):
+        self.increment(name, -value, tags)
+
+    def gauge(self, name: str, value: float, tags: list = None):
+        key = (name, tuple(tags) if tags else ())
+        with self._lock:
+            self._gauges[key] = value
+        self._ensure_worker()
+
+    def histogram(self, name: str, value: float, tags: list = None):
+        key = (name, tuple(tags) if tags else ())
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                self._histograms[key] = [1, [value]]
+            else:
+                series[0] += 1
+                samples = series[1]
+                if len(samples) < self.max_samples:
+                    samples.append(value)
+                else:
+                    slot = random.randrange(series[0])
+                    if slot < self.max_samples:
+                        samples[slot] = value
+        self._ensure_worker()
+
+    # Flushing
+    def _lines(self, counters: dict, gauges: dict, histograms: dict):
+        for (name, tags), value in counters.items():
+            yield self._line(name, _fmt(value), "c", tags)
+        for (name, tags), value in gauges.items():
+            yield self._line(name, _fmt(value), "g", tags)
+        for (name, tags), (count, samples) in histograms.items():
+            rate = len(samples) / count
+            # Keep each packed line well inside one datagram
+            step = 64
+            for i in range(0, len(samples), step):
+                values = ":".join(_fmt(v) for v in samples[i:i + step])
+                yield self._line(name, values, "h", tags, rate)
+
+    @staticmethod
+    def _line(name: str, value: str, kind: str, tags: tuple, rate: float = 1.0) -> str:
+        line = f"{name}:{value}|{kind}"
+        if rate < 1.0:
+            line += f"|@{rate:.4g}"
+        if tags:
+            line += "|#" + _join_tags(tags)
+        return line
+
+    def flush(self):
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            gauges, self._gauges = self._gauges, {}
+            histograms, self._histograms = self._histograms, {}
+        if not (counters or gauges or histograms):
+            return
+
+        packet = []
+        size = 0
+        for line in self._lines(counters, gauges, histograms):
+            encoded = len(line.encode("utf-8")) + 1
+            if packet and size + encoded > self.max_packet:
+                self._send("\n".join(packet))
+                packet, size = [], 0
+            packet.append(line)
+            size += encoded
+        if packet:
+            self._send("\n".join(packet))
+
+    def _send(self, payload: str):
+        lines = payload.count("\n") + 1
+        try:
+            if self._sender is not None:
+                self._sender(payload)
+            else:
+                if self._socket is None:
+                    self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                    self._socket.setblocking(False)
+                self._socket.sendto(payload.encode("utf-8"), self.address)
+            self.datagrams_sent += 1
+            self.lines_sent += lines
+        except OSError as e:
+            self.send_errors += 1
+            logger.debug(f"DogStatsD flush failed: {e}")
+
+    # Background worker
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._stop.clear()
+                self._worker = threading.Thread(target=self._run, name="sentinel-metrics-flush", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Metrics flush failed: {e}")
+
+    def close(self):
+        """Stop the flush thread and send whatever is buffered."""
+        worker = self._worker
+        if worker is not None:
+            self._stop.set()
+            worker.join(self.flush_interval + 1)
+            self._worker = None
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._counters) + len(self._gauges) + len(self._histograms)
+        return {
+            "pending_series": pending,
+            "datagrams_sent": self.datagrams_sent,
+            "lines_sent": self.lines_sent,
+            "send_errors": self.send_errors,
+        }
+
+
+metrics = MetricsBuffer()
+atexit.register(metrics.close)
@@ -1,56 +1,325 @@
-import json
+"""
+LLM Sentinel Monitor: streaming percentiles over request logs.
+
+    python -m app.monitor [logs/requests.jsonl ...]        # one pass, then report
+    python -m app.monitor --follow [--interval 10]         # tail the live log
+    python -m app.monitor shard.jsonl --save-sketches s1.json
+    python -m app.monitor --merge s1.json s2.json          # combine shards
+
+Records are read line by line (JSON Lines from app/log_sink.py; the legacy
+llm_logs.json array is still accepted). Latency, tokens and TPS go into
+DDSketches per (model, category), both cumulative and over a sliding window,
+so memory stays constant however long the log is.
+"""
 import os
+import sys
+import json
+import time
+import argparse
+
+try:
+    from app.sketch import DDSketch, WindowedSketch
+except ImportError:
+    from sketch import DDSketch, WindowedSketch
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-LOG_FILE = os.path.join(BASE_DIR, "llm_logs.json")
+LOG_FILE = os.getenv("SENTINEL_LOG_PATH", os.path.join(BASE_DIR, "logs", "requests.jsonl"))
+LEGACY_LOG_FILE = os.path.join(BASE_DIR, "llm_logs.json")
 
-print("\n=== LLM Sentinel Monitor Simulation ===\n")
+# Alert thresholds
+ALERT_LATENCY_P99_MS = float(os.getenv("SENTINEL_MONITOR_LATENCY_P99_MS", "3000"))
+ALERT_ERROR_RATE = float(os.getenv("SENTINEL_MONITOR_ERROR_RATE", "5"))
+TOKEN_SPIKE_THRESHOLD = int(os.getenv("SENTINEL_MONITOR_TOKEN_SPIKE", "1000"))
+MONITOR_WINDOW_SECONDS = float(os.getenv("SENTINEL_MONITOR_WINDOW_SECONDS", "300"))
 
-if not os.path.exists(LOG_FILE):
-    print("❌ llm_logs.json not found. Run save_logs.py first.")
-    exit(1) 
+SIGNALS = ("latency_ms", "tokens", "tps")
+QUANTILES = (0.5, 0.95, 0.99)
 
-# Load logs (JSON ARRAY) 
-try:
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        logs = json.load(f)
-except Exception as e:
-    print(f"❌ Failed to load logs: {e}")
-    exit(1)
-
-if not isinstance(logs, list) or not logs:
-    print("❌ No valid logs found.")
-    exit(1)
-
-# Monitoring logic
-total = len(logs)
-latencies = [l["latency_ms"] for l in logs if l.get("latency_ms") is not None]
-errors = [l for l in logs if l.get("error")]
-injections = [l for l in logs if l.get("prompt_injection")]
-token_spikes = [l for l in logs if (l.get("tokens_in") or 0) > 1000]
-
-avg_latency = sum(latencies) / len(latencies) if latencies else 0
-max_latency = max(latencies) if latencies else 0
-error_rate = (len(errors) / total) * 100 if total else 0
-
-# Output
-for i in injections:
-    print(f"🚨 PROMPT INJECTION DETECTED → '{i['prompt']}'")
-
-print("\n=== Summary ===")
-print(f"Total requests: {total}")
-print(f"Average latency: {avg_latency:.2f} ms")
-print(f"Max latency: {max_latency} ms")
-print(f"Error rate: {error_rate:.2f}%")
-print(f"Prompt injections detected: {len(injections)}")
-print(f"Token spikes detected: {len(token_spikes)}")
-
-print("\n=== Alerts ===")
-if max_latency > 3000:
-    print("🚨 HIGH LATENCY ALERT")
-if error_rate > 5:
-    print("🚨 ERROR RATE ALERT")
-if injections:
-    print("🚨 SECURITY ALERT → Prompt injection activity detected")
-
-print("\n✅ Monitor simulation complete\n")
+
+# -------------------------
+# Reading
+# -------------------------
+
+def normalize(record: dict) -> dict:
+    """Map both the JSONL sink format and the legacy save_logs.py format onto one shape."""
+    security = record.get("security") or {}
+    category = security.get("category") or ("injection" if record.get("prompt_injection") else "clean")
+    tokens_in = record.get("input_tokens", record.get("tokens_in")) or 0
+    tokens_out = record.get("output_tokens", record.get("tokens_out")) or 0
+    return {
+        "ts": float(record.get("timestamp") or time.time()),
+        "model": record.get("model") or "unknown",
+        "category": category,
+        "latency_ms": record.get("latency_ms"),
+        "tokens": tokens_in + tokens_out,
+        "tokens_in": tokens_in,
+        "tps": record.get("tokens_per_second"),
+        "error": bool(record.get("error")),
+        "prompt": record.get("prompt") or "",
+    }
+
+
+def iter_records(path: str):
+    """Yield records from one file without loading it whole (legacy arrays excepted)."""
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            # save_logs.py output: a single JSON array
+            yield from json.load(f)
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def follow(path: str, poll: float = 0.5):
+    """
+    Tail `path` like `tail -F`: yields complete new lines (None when idle)
+    and reopens the file when the sink rotates it.
+    """
+    f, inode, partial = None, None, ""
+    while True:
+        if f is None:
+            try:
+                f = open(path, "r", encoding="utf-8")
+                inode = os.fstat(f.fileno()).st_ino
+                partial = ""
+            except FileNotFoundError:
+                yield None
+                time.sleep(poll)
+                continue
+
+        chunk = f.readline()
+        if chunk:
+            partial += chunk
+            if partial.endswith("\n"):
+                line, partial = partial.strip(), ""
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        pass
+            continue
+
+        try:
+            rotated = os.stat(path).st_ino != inode
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            f.close()
+            f = None
+            continue
+        yield None
+        time.sleep(poll)
+
+
+# -------------------------
+# Aggregation
+# -------------------------
+
+class SignalStats:
+    """Cumulative and sliding-window sketches for one signal."""
+
+    def __init__(self, window_seconds: float):
+        self.total = DDSketch()
+        self.window = WindowedSketch(window_seconds)
+
+    def add(self, value, ts: float):
+        if value is None:
+            return
+        self.total.add(value)
+        self.window.add(value, ts)
+
+
+class MonitorState:
+    """
+    All monitor aggregates. Memory depends on the number of (model, category)
+    pairs, not on the number of records.
+    """
+
+    def __init__(self, window_seconds: float = MONITOR_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.groups = {}
+        self.total = 0
+        self.errors = 0
+        self.token_spikes = 0
+        self.injections = 0
+        self.latest_ts = 0.0
+        self.recent_injections = []
+
+    def _group(self, key: tuple) -> dict:
+        group = self.groups.get(key)
+        if group is None:
+            group = {s: SignalStats(self.window_seconds) for s in SIGNALS}
+            self.groups[key] = group
+        return group
+
+    def add(self, raw: dict):
+        r = normalize(raw)
+        self.total += 1
+        self.latest_ts = max(self.latest_ts, r["ts"])
+        if r["error"]:
+            self.errors += 1
+        if r["tokens_in"] > TOKEN_SPIKE_THRESHOLD:
+            self.token_spikes += 1
+        if r["category"] == "injection":
+            self.injections += 1
+            self.recent_injections = (self.recent_injections + [r["prompt"][:80]])[-5:]
+
+        group = self._group((r["model"], r["category"]))
+        for signal in SIGNALS:
+            group[signal].add(r[signal], r["ts"])
+
+    def merge(self, other: "MonitorState"):
+        """Fold another shard's cumulative sketches and counters into this one."""
+        for key, group in other.groups.items():
+            mine = self._group(key)
+            for signal in SIGNALS:
+                mine[signal].total.merge(group[signal].total)
+        self.total += other.total
+        self.errors += other.errors
+        self.token_spikes += other.token_spikes
+        self.injections += other.injections
+        self.latest_ts = max(self.latest_ts, other.latest_ts)
+        return self
+
+    def overall(self, signal: str, windowed: bool = False) -> DDSketch:
+        merged = DDSketch()
+        for group in self.groups.values():
+            stats = group[signal]
+            merged.merge(stats.window.snapshot(self.latest_ts) if windowed else stats.total)
+        return merged
+
+    # Shard persistence (cumulative sketches only)
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "errors": self.errors,
+            "token_spikes": self.token_spikes,
+            "injections": self.injections,
+            "latest_ts": self.latest_ts,
+            "groups": [
+                {"model": model, "category": category,
+                 **{s: group[s].total.to_dict() for s in SIGNALS}}
+                for (model, category), group in self.groups.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, window_seconds: float = MONITOR_WINDOW_SECONDS) -> "MonitorState":
+        state = cls(window_seconds)
+        for field in ("total", "errors", "token_spikes", "injections", "latest_ts"):
+            setattr(state, field, data[field])
+        for entry in data["groups"]:
+            group = state._group((entry["model"], entry["category"]))
+            for s in SIGNALS:
+                group[s].total = DDSketch.from_dict(entry[s])
+        return state
+
+
+# -------------------------
+# Reporting
+# -------------------------
+
+def _fmt_quantiles(sketch: DDSketch) -> str:
+    if not sketch.count:
+        return "n/a"
+    return "  ".join(f"p{int(q * 100)}={sketch.quantile(q):,.1f}" for q in QUANTILES)
+
+
+def report(state: MonitorState, windowed: bool = True):
+    print("\n=== Summary ===")
+    error_rate = state.errors / state.total * 100 if state.total else 0
+    print(f"Total requests: {state.total}")
+    print(f"Error rate: {error_rate:.2f}%")
+    print(f"Prompt injections detected: {state.injections}")
+    print(f"Token spikes detected: {state.token_spikes}")
+
+    scopes = [("all time", False)]
+    if windowed:
+        scopes.append((f"last {state.window_seconds:g}s", True))
+    for label, use_window in scopes:
+        print(f"\n--- Percentiles ({label}) ---")
+        for signal in SIGNALS:
+            print(f"{signal:>10}: {_fmt_quantiles(state.overall(signal, use_window))}")
+
+    print("\n--- Latency by model / category (all time) ---")
+    for (model, category), group in sorted(state.groups.items()):
+        sketch = group["latency_ms"].total
+        print(f"{model:<24} {category:<20} n={sketch.count:<8} {_fmt_quantiles(sketch)}")
+
+    for prompt in state.recent_injections:
+        print(f"🚨 PROMPT INJECTION DETECTED → '{prompt}'")
+
+    print("\n=== Alerts ===")
+    p99 = state.overall("latency_ms", windowed).quantile(0.99)
+    if p99 is not None and p99 > ALERT_LATENCY_P99_MS:
+        print(f"🚨 HIGH LATENCY ALERT (p99 {p99:,.0f} ms > {ALERT_LATENCY_P99_MS:,.0f} ms)")
+    if error_rate > ALERT_ERROR_RATE:
+        print("🚨 ERROR RATE ALERT")
+    if state.injections:
+        print("🚨 SECURITY ALERT → Prompt injection activity detected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM Sentinel streaming monitor")
+    parser.add_argument("paths", nargs="*", help="JSONL log shards (default: the sink's log file)")
+    parser.add_argument("--follow", action="store_true", help="tail the log and report periodically")
+    parser.add_argument("--interval", type=float, default=10, help="seconds between reports with --follow")
+    parser.add_argument("--window", type=float, default=MONITOR_WINDOW_SECONDS)
+    parser.add_argument("--save-sketches", metavar="FILE", help="write cumulative sketches for later merging")
+    parser.add_argument("--merge", nargs="+", metavar="FILE", help="merge saved sketch files and report")
+    args = parser.parse_args()
+
+    print("\n=== LLM Sentinel Monitor ===\n")
+    state = MonitorState(args.window)
+
+    if args.merge:
+        for path in args.merge:
+            with open(path, "r", encoding="utf-8") as f:
+                state.merge(MonitorState.from_dict(json.load(f), args.window))
+        report(state, windowed=False)
+        return
+
+    paths = args.paths or [p for p in (LOG_FILE, LEGACY_LOG_FILE) if os.path.exists(p)][:1]
+    if args.follow:
+        path = paths[0] if paths else LOG_FILE
+        next_report = time.monotonic() + args.interval
+        try:
+            for record in follow(path):
+                if record is not None:
+                    state.add(record)
+                if time.monotonic() >= next_report:
+                    report(state)
+                    next_report = time.monotonic() + args.interval
+        except KeyboardInterrupt:
+            pass
+    else:
+        if not paths:
+            print(f"❌ No logs found at {LOG_FILE}. Start the gateway or run save_logs.py first.")
+            sys.exit(1)
+        for path in paths:
+            for record in iter_records(path):
+                state.add(record)
+        if not state.total:
+            print("❌ No valid logs found.")
+            sys.exit(1)
+
+    report(state)
+    if args.save_sketches:
+        with open(args.save_sketches, "w", encoding="utf-8") as f:
+            json.dump(state.to_dict(), f)
+        print(f"\nSketches saved to {args.save_sketches}")
+    print("\n✅ Monitor run complete\n")
+
+
+if __name__ == "__main__":
+    main()
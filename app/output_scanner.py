@@ -0,0 +1,99 @@
+import os
+
+try:
+    from app import rules
+    from app.metrics import metrics
+except ImportError:
+    import rules
+    from metrics import metrics
+
+# Configuration
+# "redact" (default) masks matches, "cutoff" stops the response at the first
+# match, "monitor" only reports
+OUTPUT_SCAN_MODE = os.getenv("SENTINEL_OUTPUT_SCAN_MODE", "redact")
+REDACTION_TEXT = "[REDACTED]"
+CUTOFF_TEXT = " [Response truncated by Sentinel output policy]"
+
+
+class OutputScanner:
+    """
+    Incremental scanner for model output (PII and secrets).
+
+    Each `feed` scans only the new chunk plus a carry-over window of
+    (longest rule - 1) characters held back from the previous chunk, so a
+    rule split across a chunk boundary is still caught and no byte is
+    scanned more than twice. The held-back window is released by `finish`.
+    Only literal rules from the rulebook's `output` section are applied.
+    """
+
+    def __init__(self, matcher=None, mode: str = OUTPUT_SCAN_MODE, tags: list = None):
+        if mode not in ("redact", "cutoff", "monitor"):
+            raise ValueError(f"Unknown output scan mode: {mode}")
+        self.matcher = matcher or rules.active().output
+        self.mode = mode
+        self.tags = tags or []
+        self.window = max(self.matcher.max_keyword_length - 1, 0)
+        self.violations = []
+        self.cut_off = False
+        self._carry = ""
+        # Stream offset of the carry start, and how far matches were reported
+        self._base = 0
+        self._scanned = 0
+
+    def feed(self, chunk: str) -> str:
+        """Scan `chunk` and return the text that is now safe to emit."""
+        if self.cut_off:
+            return ""
+        buf = self._carry + chunk
+        spans = []
+        for start, end, kw in self.matcher.finditer(buf):
+            # Matches ending inside the old window were reported last time
+            if self._base + end > self._scanned:
+                spans.append((start, end))
+                self._report(kw)
+        self._scanned = self._base + len(buf)
+
+        if spans and self.mode == "cutoff":
+            self.cut_off = True
+            self._carry = ""
+            return buf[:min(s for s, _ in spans)]
+        if spans and self.mode == "redact":
+            buf = _redact(buf, spans)
+            self._scanned = self._base + len(buf)
+
+        keep = min(self.window, len(buf))
+        emit, self._carry = buf[:len(buf) - keep], buf[len(buf) - keep:]
+        self._base += len(emit)
+        return emit
+
+    def finish(self) -> str:
+        """Release the held-back window at end of stream."""
+        tail, self._carry = self._carry, ""
+        self._base += len(tail)
+        return "" if self.cut_off else tail
+
+    def scan_text(self, text: str) -> str:
+        """One-shot scan of a complete response."""
+        return self.feed(text) + self.finish()
+
+    def _report(self, keyword: str):
+        categories = set(self.matcher.categories_of(keyword)) or {"unknown"}
+        self.violations.append(keyword)
+        for category in categories:
+            metrics.increment(
+                "sentinel.llm.output_violation",
+                tags=self.tags + [f"category:{category}", f"action:{self.mode}"]
+            )
+
+
+def _redact(text: str, spans: list) -> str:
+    out = []
+    pos = 0
+    for start, end in sorted(spans):
+        if end <= pos:
+            continue
+        out.append(text[pos:max(start, pos)])
+        out.append(REDACTION_TEXT)
+        pos = end
+    out.append(text[pos:])
+    return "".join(out)
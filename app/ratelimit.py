@@ -0,0 +1,196 @@
+import os
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    from app.metrics import metrics
+    from app.cardinality import governor
+except ImportError:
+    from metrics import metrics
+    from cardinality import governor
+
+# Configuration
+API_KEY_HEADER = os.getenv("SENTINEL_API_KEY_HEADER", "X-API-Key")
+# Request bucket: sustained requests/second and burst size per key
+RATE_REQUESTS_PER_SECOND = float(os.getenv("SENTINEL_RATE_RPS", "2"))
+RATE_REQUEST_BURST = float(os.getenv("SENTINEL_RATE_BURST", "20"))
+# Token bucket: sustained Gemini tokens/second and burst size per key
+RATE_TOKENS_PER_SECOND = float(os.getenv("SENTINEL_RATE_TOKENS_PER_SECOND", "500"))
+RATE_TOKEN_BURST = float(os.getenv("SENTINEL_RATE_TOKEN_BURST", "20000"))
+RATE_MAX_KEYS = int(os.getenv("SENTINEL_RATE_MAX_KEYS", "10000"))
+RATE_IDLE_SECONDS = float(os.getenv("SENTINEL_RATE_IDLE_SECONDS", "900"))
+# Every PENALTY_THRESHOLD security violations divide a key's rates by 1/PENALTY_FACTOR
+PENALTY_THRESHOLD = float(os.getenv("SENTINEL_PENALTY_THRESHOLD", "3"))
+PENALTY_FACTOR = float(os.getenv("SENTINEL_PENALTY_FACTOR", "0.25"))
+PENALTY_MAX_LEVEL = int(os.getenv("SENTINEL_PENALTY_MAX_LEVEL", "3"))
+# Violations are forgotten with this half-life
+PENALTY_HALF_LIFE = float(os.getenv("SENTINEL_PENALTY_HALF_LIFE", "600"))
+
+
+def key_id(raw_key: str) -> str:
+    """Stable, non-reversible identifier for metrics and logs."""
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()[:12]
+
+
+class Throttled(Exception):
+    """Raised by RateLimiter.check; `retry_after` is in seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded ({reason}), retry in {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class KeyState:
+    __slots__ = ("requests", "tokens", "updated", "violations", "violations_at", "last_seen")
+
+    def __init__(self, now: float, request_burst: float, token_burst: float):
+        self.requests = request_burst
+        self.tokens = token_burst
+        self.updated = now
+        self.violations = 0.0
+        self.violations_at = now
+        self.last_seen = now
+
+
+class RateLimiter:
+    """
+    Per-caller token buckets for requests and upstream tokens.
+
+    Both buckets refill lazily on access. Requests are taken up front (one
+    per prompt for a batch, which may overdraw the bucket); the token bucket
+    is charged after the call with the real usage. Either bucket in debt
+    blocks the key until it refills. Security violations
+    decay with a half-life; each PENALTY_THRESHOLD of them shrinks the key's
+    rates and burst by PENALTY_FACTOR. Keys live in an LRU dict (O(1) per
+    request), capped at `max_keys` and swept when idle.
+    """
+
+    def __init__(self,
+                 request_rate: float = RATE_REQUESTS_PER_SECOND,
+                 request_burst: float = RATE_REQUEST_BURST,
+                 token_rate: float = RATE_TOKENS_PER_SECOND,
+                 token_burst: float = RATE_TOKEN_BURST,
+                 max_keys: int = RATE_MAX_KEYS,
+                 idle_seconds: float = RATE_IDLE_SECONDS,
+                 clock=time.monotonic):
+        self.request_rate = request_rate
+        self.request_burst = request_burst
+        self.token_rate = token_rate
+        self.token_burst = token_burst
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        self._clock = clock
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    # Internals (caller holds the lock)
+    def _state(self, key: str, now: float) -> KeyState:
+        state = self._keys.get(key)
+        if state is None:
+            state = KeyState(now, self.request_burst, self.token_burst)
+            self._keys[key] = state
+            self._sweep(now)
+        else:
+            self._keys.move_to_end(key)
+        state.last_seen = now
+        return state
+
+    def _sweep(self, now: float):
+        # LRU order == last-seen order, so idle keys are always at the front
+        keys = self._keys
+        while keys:
+            oldest = next(iter(keys))
+            if len(keys) <= self.max_keys and now - keys[oldest].last_seen < self.idle_seconds:
+                break
+            del keys[oldest]
+            self.evicted += 1
+
+    def _penalty(self, state: KeyState, now: float) -> float:
+        if state.violations:
+            state.violations *= 0.5 ** ((now - state.violations_at) / PENALTY_HALF_LIFE)
+            state.violations_at = now
+        level = min(PENALTY_MAX_LEVEL, int(state.violations // PENALTY_THRESHOLD))
+        return PENALTY_FACTOR ** level
+
+    def _refill(self, state: KeyState, now: float, multiplier: float):
+        elapsed = now - state.updated
+        state.updated = now
+        state.requests = min(self.request_burst * multiplier,
+                             state.requests + elapsed * self.request_rate * multiplier)
+        state.tokens = min(self.token_burst * multiplier,
+                           state.tokens + elapsed * self.token_rate * multiplier)
+
+    # Public API
+    def check(self, key: str, cost: float = 1, allow_debt: bool = False):
+        """
+        Take `cost` requests from the key's bucket or raise Throttled.
+        With `allow_debt` (batches larger than the burst), one request left
+        is enough to take the whole cost; the bucket goes negative and the
+        key is throttled until it has paid the debt off.
+        """
+        now = self._clock()
+        with self._lock:
+            state = self._state(key, now)
+            multiplier = self._penalty(state, now)
+            self._refill(state, now, multiplier)
+
+            reason, retry_after = None, 0.0
+            if state.tokens <= 0:
+                reason = "tokens"
+                retry_after = (1 - state.tokens) / (self.token_rate * multiplier)
+            elif state.requests < (min(cost, 1) if allow_debt else cost):
+                reason = "requests"
+                needed = 1 if allow_debt else cost
+                retry_after = (needed - state.requests) / (self.request_rate * multiplier)
+            else:
+                state.requests -= cost
+
+        tags = [f"api_key:{governor.govern('api_key', key)}", f"penalized:{'true' if multiplier < 1 else 'false'}"]
+        if reason:
+            metrics.increment("sentinel.ratelimit.throttled", tags=tags + [f"reason:{reason}"])
+            raise Throttled(reason, retry_after)
+        metrics.gauge("sentinel.ratelimit.remaining_requests", int(state.requests), tags=tags)
+
+    def charge(self, key: str, tokens: int):
+        """Debit real upstream token usage after a call."""
+        if tokens <= 0:
+            return
+        now = self._clock()
+        with self._lock:
+            state = self._state(key, now)
+            self._refill(state, now, self._penalty(state, now))
+            state.tokens -= tokens
+        metrics.increment("sentinel.ratelimit.tokens_charged", tokens,
+                          tags=[f"api_key:{governor.govern('api_key', key)}"])
+
+    def record_violation(self, key: str):
+        """A request from this key tripped the security checks."""
+        now = self._clock()
+        with self._lock:
+            state = self._state(key, now)
+            self._penalty(state, now)
+            state.violations += 1
+            level = min(PENALTY_MAX_LEVEL, int(state.violations // PENALTY_THRESHOLD))
+        if level:
+            metrics.increment("sentinel.ratelimit.penalized", tags=[f"level:{level}"])
+
+    def stats(self) -> dict:
+        now = self._clock()
+        with self._lock:
+            self._sweep(now)
+            penalized = sum(1 for s in self._keys.values() if s.violations >= PENALTY_THRESHOLD)
+            tracked = len(self._keys)
+        metrics.gauge("sentinel.ratelimit.keys", tracked)
+        return {"keys": tracked, "penalized": penalized, "evicted": self.evicted}
+
+
+ratelimiter = RateLimiter()
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
@@ -0,0 +1,191 @@
+import os
+import time
+import random
+import logging
+import threading
+
+try:
+    from app.metrics import metrics
+    from app.sketch import WindowedSketch
+except ImportError:
+    from metrics import metrics
+    from sketch import WindowedSketch
+
+logger = logging.getLogger("llm-sentinel")
+
+# Configuration
+# Preference order: the first model is the primary, the rest are fallbacks (faster/cheaper first)
+ROUTER_MODELS = [m.strip() for m in os.getenv(
+    "SENTINEL_MODELS", "gemini-2.0-flash,gemini-2.0-flash-lite").split(",") if m.strip()]
+# Latency / error-rate SLO a model must meet to keep (or win back) traffic
+SLO_P95_MS = float(os.getenv("SENTINEL_SLO_P95_MS", "4000"))
+SLO_ERROR_RATE = float(os.getenv("SENTINEL_SLO_ERROR_RATE", "0.05"))
+ROUTER_WINDOW_SECONDS = float(os.getenv("SENTINEL_ROUTER_WINDOW_SECONDS", "60"))
+ROUTER_MIN_SAMPLES = int(os.getenv("SENTINEL_ROUTER_MIN_SAMPLES", "20"))
+# Hysteresis: a better model must beat SLO x RECOVER_RATIO to win traffic back,
+# and no switch happens within HOLD_SECONDS of the previous one
+ROUTER_RECOVER_RATIO = float(os.getenv("SENTINEL_ROUTER_RECOVER_RATIO", "0.7"))
+ROUTER_HOLD_SECONDS = float(os.getenv("SENTINEL_ROUTER_HOLD_SECONDS", "30"))
+# Share of traffic sent to the next better model while on a fallback, to see if it recovered
+ROUTER_PROBE_RATE = float(os.getenv("SENTINEL_ROUTER_PROBE_RATE", "0.05"))
+# ...and at least one probe this often, so low traffic still gathers samples
+ROUTER_PROBE_INTERVAL_SECONDS = float(os.getenv("SENTINEL_ROUTER_PROBE_INTERVAL_SECONDS", "2"))
+
+
+class ModelHealth:
+    """Rolling latency sketch and error counts for one model."""
+
+    def __init__(self, window_seconds: float, slots: int = 10):
+        self.latency = WindowedSketch(window_seconds, slots)
+        self.slot_seconds = window_seconds / slots
+        # slot_id -> [calls, errors]
+        self._counts = [None] * slots
+
+    def record(self, latency_ms: float, error: bool, now: float):
+        slot_id = int(now // self.slot_seconds)
+        index = slot_id % len(self._counts)
+        entry = self._counts[index]
+        if entry is None or entry[0] != slot_id:
+            entry = [slot_id, 0, 0]
+            self._counts[index] = entry
+        entry[1] += 1
+        if error:
+            entry[2] += 1
+        else:
+            # Failed calls say nothing about how fast the model answers
+            self.latency.add(latency_ms, now)
+
+    def snapshot(self, now: float) -> dict:
+        newest = int(now // self.slot_seconds)
+        calls = errors = 0
+        for entry in self._counts:
+            if entry is not None and newest - len(self._counts) < entry[0] <= newest:
+                calls += entry[1]
+                errors += entry[2]
+        return {
+            "calls": calls,
+            "error_rate": errors / calls if calls else 0.0,
+            "p95_ms": self.latency.snapshot(now).quantile(0.95),
+        }
+
+
+class ModelRouter:
+    """
+    Latency-SLO router over an ordered list of models.
+
+    Traffic goes to the active model. When its rolling p95 or error rate
+    breaches the SLO, the router steps down to the next model; while on a
+    fallback, a small probe share goes one step up, and the router steps
+    back once that model runs comfortably inside the SLO (p95 and error
+    rate under SLO x recover_ratio). Switches are at least `hold_seconds`
+    apart, so a model near the threshold does not flap.
+    """
+
+    def __init__(self,
+                 models: list = None,
+                 slo_p95_ms: float = SLO_P95_MS,
+                 slo_error_rate: float = SLO_ERROR_RATE,
+                 window_seconds: float = ROUTER_WINDOW_SECONDS,
+                 min_samples: int = ROUTER_MIN_SAMPLES,
+                 recover_ratio: float = ROUTER_RECOVER_RATIO,
+                 hold_seconds: float = ROUTER_HOLD_SECONDS,
+                 probe_rate: float = ROUTER_PROBE_RATE,
+                 probe_interval: float = ROUTER_PROBE_INTERVAL_SECONDS,
+                 clock=time.monotonic,
+                 seed: int = None):
+        self.models = list(models or ROUTER_MODELS)
+        self.slo_p95_ms = slo_p95_ms
+        self.slo_error_rate = slo_error_rate
+        self.min_samples = min_samples
+        self.recover_ratio = recover_ratio
+        self.hold_seconds = hold_seconds
+        self.probe_rate = probe_rate
+        self.probe_interval = probe_interval
+        self._clock = clock
+        self._rng = random.Random(seed)
+        self._health = {m: ModelHealth(window_seconds) for m in self.models}
+        self._lock = threading.Lock()
+        self.active = 0
+        self.reason = "primary"
+        self.changed_at = clock() - hold_seconds
+        self._evaluated_at = 0.0
+        self._probed_at = 0.0
+        self.switches = 0
+
+    @property
+    def primary(self) -> str:
+        return self.models[0]
+
+    def choose(self) -> tuple:
+        """(model, reason) for the next request."""
+        now = self._clock()
+        with self._lock:
+            if self.active and (self._rng.random() < self.probe_rate
+                                or now - self._probed_at >= self.probe_interval):
+                self._probed_at = now
+                model, reason = self.models[self.active - 1], "probe"
+            else:
+                model, reason = self.models[self.active], self.reason
+        metrics.increment("sentinel.llm.route", tags=[f"model:{model}", f"reason:{reason}"])
+        return model, reason
+
+    def record(self, model: str, latency_ms: float, error: bool = False):
+        """Outcome of one upstream attempt against `model`."""
+        health = self._health.get(model)
+        if health is None:
+            return
+        now = self._clock()
+        with self._lock:
+            health.record(latency_ms, error, now)
+            # Quantiles are cheap but not free: re-evaluate at most once a second
+            if now - self._evaluated_at >= 1.0:
+                self._evaluated_at = now
+                self._evaluate(now)
+
+    def _breach(self, stats: dict, ratio: float = 1.0):
+        if stats["error_rate"] > self.slo_error_rate * ratio:
+            return "slo_errors"
+        if stats["p95_ms"] is not None and stats["p95_ms"] > self.slo_p95_ms * ratio:
+            return "slo_latency"
+        return None
+
+    def _evaluate(self, now: float):
+        if now - self.changed_at < self.hold_seconds:
+            return
+        current = self._health[self.models[self.active]].snapshot(now)
+        breach = self._breach(current) if current["calls"] >= self.min_samples else None
+        if breach and self.active < len(self.models) - 1:
+            self._switch(self.active + 1, f"fallback_{breach}", now)
+            return
+        if self.active:
+            better = self._health[self.models[self.active - 1]].snapshot(now)
+            if better["calls"] >= self.min_samples and not self._breach(better, self.recover_ratio):
+                self._switch(self.active - 1, "primary" if self.active == 1 else "fallback_recovering", now)
+
+    def _switch(self, index: int, reason: str, now: float):
+        previous = self.models[self.active]
+        self.active = index
+        self.reason = reason
+        self.changed_at = now
+        self.switches += 1
+        metrics.increment("sentinel.llm.route_switch",
+                          tags=[f"from:{previous}", f"to:{self.models[index]}", f"reason:{reason}"])
+        logger.warning(f"Model route switched {previous} -> {self.models[index]} ({reason})")
+
+    def stats(self) -> dict:
+        now = self._clock()
+        with self._lock:
+            health = {m: self._health[m].snapshot(now) for m in self.models}
+            active, reason = self.models[self.active], self.reason
+        metrics.gauge("sentinel.llm.route_active", self.models.index(active))
+        return {
+            "active": active,
+            "reason": reason,
+            "switches": self.switches,
+            "slo": {"p95_ms": self.slo_p95_ms, "error_rate": self.slo_error_rate},
+            "models": {m: {k: round(v, 3) if isinstance(v, float) else v for k, v in h.items()}
+                       for m, h in health.items()},
+        }
+
+
+router = ModelRouter()
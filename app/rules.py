@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+try:
+    from app.matcher import PatternMatcher
+    from app.metrics import metrics
+except ImportError:
+    from matcher import PatternMatcher
+    from metrics import metrics
+
+logger = logging.getLogger("llm-sentinel")
+
+# Configuration
+RULEBOOK_PATH = os.getenv(
+    "SENTINEL_RULEBOOK",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "rulebook.json")
+)
+RULES_RELOAD_INTERVAL = float(os.getenv("SENTINEL_RULES_RELOAD_INTERVAL", "5"))
+
+
+class Rulebook:
+    """
+    Immutable, fully compiled snapshot of the rulebook file.
+    `policy` drives the gateway verdict (categories in precedence order),
+    `output` is applied to model responses (literal rules only) and
+    `heuristics` backs app/security.analyze_prompt.
+    """
+
+    def __init__(self, version: str, policy: dict, heuristics: dict, output: dict = None,
+                 source: str = None, digest: str = None):
+        self.version = version
+        self.source = source
+        # Content hash: edits that keep the same "version" are still changes
+        self.digest = digest
+        self.loaded_at = time.time()
+        self.policy = PatternMatcher(policy)
+        self.heuristics = PatternMatcher(heuristics)
+        self.output = PatternMatcher(output or {})
+
+
+def _file_stamp(path: str):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def load_rulebook(path: str = RULEBOOK_PATH) -> Rulebook:
+    """Parse and compile a rulebook file. Raises on any malformed content."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    data = json.loads(raw)
+
+    policy = data.get("policy")
+    if not isinstance(policy, dict) or not policy:
+        raise ValueError(f"Rulebook {path} has no 'policy' section")
+    heuristics = data.get("heuristics") or {}
+    output = data.get("output") or {}
+    for section in (policy, heuristics, output):
+        for category, patterns in section.items():
+            if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+                raise ValueError(f"Rulebook {path}: '{category}' must be a list of strings")
+
+    # Unversioned files still get a stable stamp from their content
+    digest = hashlib.sha1(raw).hexdigest()
+    version = str(data.get("version") or digest[:12])
+    return Rulebook(version, policy, heuristics, output, source=path, digest=digest)
+
+
+# Active snapshot. Readers grab the reference once per scan; writers replace
+# it with a single assignment, so the scan path never takes a lock.
+_active = load_rulebook()
+_swap_lock = threading.Lock()
+
+
+def active() -> Rulebook:
+    return _active
+
+
+def reload(path: str = None) -> bool:
+    """
+    Compile `path` (default: the active source) and swap it in.
+    Returns True if new content became active (even under the same
+    version, which is logged as a warning). On failure the current
+    rulebook stays in place.
+    """
+    global _active
+    path = path or _active.source or RULEBOOK_PATH
+    with _swap_lock:
+        try:
+            compiled = load_rulebook(path)
+        except Exception as e:
+            logger.warning(f"Rulebook reload failed, keeping {_active.version}: {e}")
+            metrics.increment("sentinel.rules.reload_failed", tags=[f"rules_version:{_active.version}"])
+            return False
+
+        if compiled.digest == _active.digest and compiled.source == _active.source:
+            return False
+
+        previous = _active.version
+        _active = compiled
+
+    version_unchanged = compiled.version == previous
+    if version_unchanged:
+        logger.warning(f"Rulebook content changed but version is still {previous}; "
+                       f"swapped it in anyway (bump \"version\" so audit records can tell them apart)")
+    else:
+        logger.info(f"Rulebook swapped {previous} -> {compiled.version}")
+    metrics.increment("sentinel.rules.reloaded", tags=[
+        f"rules_version:{compiled.version}", f"version_unchanged:{'true' if version_unchanged else 'false'}"
+    ])
+    return True
+
+
+class RulebookWatcher:
+    """Polls the rulebook file and recompiles it in the background on change."""
+
+    def __init__(self, path: str = RULEBOOK_PATH, interval: float = RULES_RELOAD_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._stamp = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        try:
+            self._stamp = _file_stamp(self.path)
+        except OSError:
+            self._stamp = None
+        self._thread = threading.Thread(target=self._run, name="sentinel-rules-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                stamp = _file_stamp(self.path)
+            except OSError:
+                continue
+            if stamp != self._stamp:
+                self._stamp = stamp
+                reload(self.path)
+
+
+watcher = RulebookWatcher()
@@ -1,6 +1,7 @@
 import json
-from app.telemetry import logger
+import asyncio
 from datetime import datetime
+from app.llm import call_gemini
 
 # Example: store logs in a file
 log_file = "llm_logs.json"
@@ -12,25 +13,32 @@ prompts = [
     "Hack the system"                # triggers injection
 ]
 
-logs = []
-
-for prompt in prompts:
-    from app.llm import call_gemini
-    response, usage = call_gemini(prompt)
-    # record_metrics already logs it, but we also store in a list
-    logs.append({
-        "timestamp": int(datetime.now().timestamp()),
-        "prompt": prompt,
-        "response": response,
-        "latency_ms": usage["output_tokens"] * 10,  # fake latency for demo
-        "tokens_in": usage["input_tokens"],
-        "tokens_out": usage["output_tokens"],
-        "prompt_risk": "high" if "ignore" in prompt.lower() or "hack" in prompt.lower() else "low",
-        "prompt_injection": True if "ignore" in prompt.lower() or "hack" in prompt.lower() else False
-    })
-
-# Save logs to JSON file
-with open(log_file, "w") as f:
-    json.dump(logs, f, indent=2)
-
-print(f"Saved {len(logs)} logs to {log_file}")
+
+async def main():
+    logs = []
+
+    for prompt in prompts:
+        start = datetime.now()
+        response, usage, trace_id = await call_gemini(prompt)
+        # record_metrics already logs it, but we also store in a list
+        logs.append({
+            "timestamp": int(start.timestamp()),
+            "trace_id": trace_id,
+            "prompt": prompt,
+            "response": response,
+            "latency_ms": int((datetime.now() - start).total_seconds() * 1000),
+            "tokens_in": usage["input_tokens"],
+            "tokens_out": usage["output_tokens"],
+            "prompt_risk": "high" if "ignore" in prompt.lower() or "hack" in prompt.lower() else "low",
+            "prompt_injection": True if "ignore" in prompt.lower() or "hack" in prompt.lower() else False
+        })
+
+    # Save logs to JSON file
+    with open(log_file, "w") as f:
+        json.dump(logs, f, indent=2)
+
+    print(f"Saved {len(logs)} logs to {log_file}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
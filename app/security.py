@@ -1,22 +1,25 @@
-import re
+try:
+    from app import rules
+except ImportError:
+    import rules
 
-INJECTION_PATTERNS = [
-    r"ignore previous instructions",
-    r"system prompt",
-    r"you are chatgpt",
-    r"bypass",
-    r"jailbreak"
-]
-
-def analyze_prompt(prompt: str):
-    injection_detected = any(
-        re.search(pat, prompt.lower()) for pat in INJECTION_PATTERNS
-    )
+# Injection patterns come from the "heuristics" section of the rulebook
 
+def _result(prompt: str, hits: dict, rules_version: str):
     abuse_score = min(len(prompt) / 1000, 1.0) 
 
     return {
-        "injection_detected": injection_detected,
+        "injection_detected": "injection" in hits,
         "abuse_score": abuse_score,
-        "prompt_length": len(prompt)
+        "prompt_length": len(prompt),
+        "rules_version": rules_version
     }
+
+def analyze_prompt(prompt: str):
+    book = rules.active()
+    return _result(prompt, book.heuristics.scan(prompt), book.version)
+
+def analyze_prompts(prompts: list[str]):
+    book = rules.active()
+    hits = book.heuristics.scan_many(prompts)
+    return [_result(p, h, book.version) for p, h in zip(prompts, hits)]
@@ -0,0 +1,239 @@
+import math
+
+
+class DDSketch:
+    """
+    Relative-error quantile sketch (DDSketch). Values land in logarithmic
+    buckets, so any reported quantile is within `relative_accuracy` of the
+    true value. Memory is capped at `max_buckets` (the lowest buckets are
+    collapsed first, which only affects the smallest values). Two sketches
+    with the same accuracy merge exactly by adding bucket counts.
+    """
+
+    MIN_VALUE = 1e-9
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: int = 1):
+        if value is None or value < 0:
+            return
+        if value < self.MIN_VALUE:
+            self.zero_count += weight
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + weight
+            if len(self.bins) > self.max_buckets:
+                self._collapse()
+        self.count += weight
+        self.sum += value * weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def _collapse(self):
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_buckets
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.bins[target] += self.bins.pop(key)
+
+    def quantile(self, q: float):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def merge(self, other: "DDSketch"):
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, n in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + n
+        if len(self.bins) > self.max_buckets:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def copy(self) -> "DDSketch":
+        return DDSketch(self.relative_accuracy, self.max_buckets).merge(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "bins": {str(k): n for k, n in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DDSketch":
+        sketch = cls(data["relative_accuracy"], data.get("max_buckets", 2048))
+        sketch.bins = {int(k): n for k, n in data["bins"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+
+class WindowedSketch:
+    """
+    Sliding-window view over a ring of per-slot DDSketches, keyed by
+    event time. Memory is `slots` sketches regardless of traffic; a
+    snapshot merges the slots that fall inside the window.
+    """
+
+    def __init__(self, window_seconds: float = 300, slots: int = 10,
+                 relative_accuracy: float = 0.01):
+        self.slot_seconds = window_seconds / slots
+        self.relative_accuracy = relative_accuracy
+        self._ring = [None] * slots
+        self.latest = 0.0
+
+    def add(self, value: float, ts: float):
+        slot_id = int(ts // self.slot_seconds)
+        index = slot_id % len(self._ring)
+        entry = self._ring[index]
+        if entry is None or entry[0] != slot_id:
+            if entry is not None and entry[0] > slot_id:
+                return  # Older than the window: ignore late arrivals
+            entry = (slot_id, DDSketch(self.relative_accuracy))
+            self._ring[index] = entry
+        entry[1].add(value)
+        self.latest = max(self.latest, ts)
+
+    def snapshot(self, now: float = None) -> DDSketch:
+        now = self.latest if now is None else now
+        newest = int(now // self.slot_seconds)
+        merged = DDSketch(self.relative_accuracy)
+        for entry in self._ring:
+            if entry is not None and newest - len(self._ring) < entry[0] <= newest:
+                merged.merge(entry[1])
+        return merged
+
+
+class HdrHistogram:
+    """
+    High Dynamic Range histogram of integer values (e.g. microseconds) with
+    `significant_digits` of precision across the whole range: log2 buckets
+    of linearly spaced sub-buckets, as in HdrHistogram. Mergeable, and
+    writes the standard .hgrm percentile distribution for plotting.
+    """
+
+    def __init__(self, significant_digits: int = 3):
+        # Sub-buckets per bucket: smallest power of two giving the precision
+        self.sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.significant_digits = significant_digits
+        self.counts = {}
+        self.total_count = 0
+        self.min = math.inf
+        self.max = 0
+        self.sum = 0
+
+    def _index(self, value: int) -> tuple:
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return shift, value >> shift
+
+    @staticmethod
+    def _value_at(shift: int, sub: int) -> int:
+        # Midpoint of the values sharing this slot
+        return (sub << shift) + ((1 << shift) >> 1)
+
+    def record(self, value: float, count: int = 1):
+        value = max(0, int(value))
+        key = self._index(value)
+        self.counts[key] = self.counts.get(key, 0) + count
+        self.total_count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "HdrHistogram"):
+        for key, n in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + n
+        self.total_count += other.total_count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.total_count if self.total_count else 0.0
+
+    def _sorted(self):
+        return sorted(self.counts.items(), key=lambda kv: (kv[0][1] << kv[0][0]))
+
+    def value_at_percentile(self, percentile: float) -> int:
+        if not self.total_count:
+            return 0
+        target = max(1, math.ceil(percentile / 100 * self.total_count))
+        seen = 0
+        for (shift, sub), n in self._sorted():
+            seen += n
+            if seen >= target:
+                return min(self._value_at(shift, sub), self.max)
+        return self.max
+
+    def output_percentile_distribution(self, out, scale: float = 1.0, ticks_per_half_distance: int = 5):
+        """Write the HdrHistogram .hgrm text format; values are divided by `scale`."""
+        out.write(f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}\n\n")
+        if not self.total_count:
+            return
+        items = self._sorted()
+        seen, i = 0, 0
+        percentile = 0.0
+        while True:
+            target = max(1, math.ceil(percentile / 100 * self.total_count))
+            while seen < target and i < len(items):
+                seen += items[i][1]
+                i += 1
+            (shift, sub) = items[i - 1][0]
+            value = min(self._value_at(shift, sub), self.max) / scale
+            if percentile >= 100 or seen >= self.total_count:
+                out.write(f"{value:12.3f} {1.0:14.12f} {self.total_count:10d}\n")
+                break
+            inverse = 1 / (1 - percentile / 100)
+            out.write(f"{value:12.3f} {percentile / 100:14.12f} {seen:10d} {inverse:14.2f}\n")
+            # Reporting steps halve every time the remaining distance halves
+            half_distance = 2 ** (math.floor(math.log2(inverse)) + 1)
+            percentile += 100 / (half_distance * ticks_per_half_distance)
+        mean = self.mean
+        var = sum(n * (self._value_at(s, b) - mean) ** 2 for (s, b), n in items) / self.total_count
+        out.write(f"#[Mean    = {mean / scale:12.3f}, StdDeviation   = {math.sqrt(var) / scale:12.3f}]\n")
+        out.write(f"#[Max     = {self.max / scale:12.3f}, Total count    = {self.total_count:12d}]\n")
+        out.write(f"#[Buckets = {len({s for s, _ in self.counts}):12d}, "
+                  f"SubBuckets     = {1 << self.sub_bucket_bits:12d}]\n")
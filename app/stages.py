@@ -0,0 +1,235 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import functools
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    from app.sketch import WindowedSketch
+    from app.startup import tracer
+except ImportError:
+    from sketch import WindowedSketch
+    from startup import tracer
+
+# Configuration
+# Record each stage as a child span of the request trace
+STAGE_SPANS = os.getenv("SENTINEL_STAGE_SPANS", "1") != "0"
+STAGE_WINDOW_SECONDS = float(os.getenv("SENTINEL_STAGE_WINDOW_SECONDS", "300"))
+# /debug/* endpoints are unauthenticated, so they are off unless enabled;
+# the profiler additionally has to be explicitly allowed
+DEBUG_ENDPOINTS = os.getenv("SENTINEL_DEBUG_ENDPOINTS", "0") == "1"
+PROFILER_ALLOWED = os.getenv("SENTINEL_PROFILER_ALLOWED", "0") == "1"
+PROFILER_INTERVAL_MS = float(os.getenv("SENTINEL_PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_STACKS = int(os.getenv("SENTINEL_PROFILER_MAX_STACKS", "5000"))
+
+# Per-request {stage: [total_ms, count]}; set by ServerTimingMiddleware
+_request_stages = contextvars.ContextVar("sentinel_request_stages", default=None)
+
+
+class StageStats:
+    """Rolling per-stage latency sketches across all requests."""
+
+    def __init__(self, window_seconds: float = STAGE_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._sketches = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, ms: float):
+        now = time.monotonic()
+        with self._lock:
+            sketch = self._sketches.get(name)
+            if sketch is None:
+                sketch = self._sketches[name] = WindowedSketch(self.window_seconds)
+            sketch.add(ms, now)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            merged = {name: sketch.snapshot(now) for name, sketch in self._sketches.items()}
+        result = {}
+        for name, sketch in sorted(merged.items()):
+            if not sketch.count:
+                continue
+            result[name] = {
+                "count": sketch.count,
+                "mean_ms": round(sketch.mean, 3),
+                "p50_ms": round(sketch.quantile(0.5), 3),
+                "p95_ms": round(sketch.quantile(0.95), 3),
+                "p99_ms": round(sketch.quantile(0.99), 3),
+                "max_ms": round(sketch.max, 3),
+            }
+        return result
+
+
+stage_stats = StageStats()
+
+
+def record_stage(name: str, ms: float):
+    """Add one timing to the rolling stats and the current request's breakdown."""
+    stage_stats.record(name, ms)
+    stages = _request_stages.get()
+    if stages is not None:
+        entry = stages.get(name)
+        if entry is None:
+            stages[name] = [ms, 1]
+        else:
+            entry[0] += ms
+            entry[1] += 1
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one stage (and a child span when STAGE_SPANS is on)."""
+    span = tracer.trace(f"sentinel.stage.{name}", service="llm-sentinel") if STAGE_SPANS else None
+    start = time.perf_counter()
+    try:
+        yield span
+    finally:
+        record_stage(name, (time.perf_counter() - start) * 1000)
+        if span is not None:
+            span.finish()
+
+
+def timed(name: str):
+    """Decorator form of stage() for plain and async functions."""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def server_timing(stages: dict, total_ms: float = None) -> str:
+    """Server-Timing header value, e.g. 'security_scan;dur=0.41, upstream_attempt;dur=120.3;desc="x2"'."""
+    parts = []
+    for name, (ms, count) in stages.items():
+        part = f"{name};dur={ms:.2f}"
+        if count > 1:
+            part += f';desc="x{count}"'
+        parts.append(part)
+    if total_ms is not None:
+        parts.append(f"total;dur={total_ms:.2f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware: gives each HTTP request its own stage breakdown
+    and reports it in a Server-Timing header. Streaming responses send
+    their headers early, so they only carry the stages finished by then.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stages = {}
+        token = _request_stages.set(stages)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                value = server_timing(stages, (time.perf_counter() - start) * 1000)
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", value.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stages.reset(token)
+
+
+class SamplingProfiler:
+    """
+    Low-overhead wall-clock profiler: a daemon thread samples every other
+    thread's Python stack each `interval_ms` and counts the collapsed
+    stacks (flamegraph "folded" format). Off until started.
+    """
+
+    def __init__(self, interval_ms: float = PROFILER_INTERVAL_MS, max_stacks: int = PROFILER_MAX_STACKS):
+        self.interval_ms = interval_ms
+        self.max_stacks = max_stacks
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.samples = 0
+        self.started_at = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sentinel-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        interval = self.interval_ms / 1000
+        while not self._stop.wait(interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack = ";".join(reversed(names))
+                with self._lock:
+                    if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                        self._stacks[stack] += 1
+                    self.samples += 1
+
+    def top(self, limit: int = 20) -> list:
+        with self._lock:
+            return [{"stack": stack, "samples": n} for stack, n in self._stacks.most_common(limit)]
+
+    def folded(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {n}\n" for stack, n in self._stacks.most_common())
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "allowed": PROFILER_ALLOWED,
+            "interval_ms": self.interval_ms,
+            "samples": self.samples,
+            "started_at": self.started_at,
+        }
+
+
+profiler = SamplingProfiler()
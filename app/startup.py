@@ -0,0 +1,93 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+
+try:
+    from app.metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger("llm-sentinel")
+
+# Configuration
+# "background" (default): serve right away and warm up alongside,
+# "blocking": finish warming up before the first request, "off": first use pays
+WARMUP_MODE = os.getenv("SENTINEL_WARMUP", "background").lower()
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("SENTINEL_WARMUP_TIMEOUT_SECONDS", "10"))
+
+_lock = threading.Lock()
+_tracer = None
+_datadog_ready = False
+
+# Reported on /health
+status = {"mode": WARMUP_MODE, "state": "pending", "duration_ms": None, "error": None}
+
+
+def get_tracer():
+    """ddtrace.tracer, imported on first use (a no-op when ddtrace-run already loaded it)."""
+    global _tracer
+    if _tracer is None:
+        with _lock:
+            if _tracer is None:
+                from ddtrace import tracer
+                _tracer = tracer
+    return _tracer
+
+
+class LazyTracer:
+    """Stands in for ddtrace.tracer at module level so importing the app stays cheap."""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        return getattr(get_tracer(), name)
+
+
+tracer = LazyTracer()
+
+
+def init_datadog():
+    """datadog.initialize() with the API/app keys, once, before the first API call."""
+    global _datadog_ready
+    if _datadog_ready:
+        return
+    with _lock:
+        if _datadog_ready:
+            return
+        from datadog import initialize
+        initialize(api_key=os.getenv("DATADOG_API_KEY"), app_key=os.getenv("DATADOG_APP_KEY"))
+        _datadog_ready = True
+
+
+def _init_telemetry():
+    get_tracer()
+    init_datadog()
+
+
+async def warm_up(backend, model: str):
+    """
+    Pay the one-off costs of the first request ahead of it: tracer and
+    Datadog imports off the event loop, then the backend's own warm-up
+    (client construction and one cheap upstream round trip). Failures are
+    logged, never raised; the first request then initializes on demand.
+    """
+    status["state"] = "running"
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(_init_telemetry)
+        async with asyncio.timeout(WARMUP_TIMEOUT_SECONDS):
+            await backend.warm_up(model)
+        status["state"] = "done"
+    except asyncio.CancelledError:
+        status["state"] = "cancelled"
+        raise
+    except Exception as e:
+        status["state"] = "failed"
+        status["error"] = f"{type(e).__name__}: {e}"[:200]
+        logger.warning("Warm-up failed, initializing on first use: %s", status["error"])
+    finally:
+        status["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        metrics.histogram("sentinel.startup.warmup_ms", status["duration_ms"],
+                          tags=[f"backend:{backend.name}", f"state:{status['state']}"])
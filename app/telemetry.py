@@ -1,15 +1,25 @@
-import os
 import time
 import logging
 import uuid
-from datadog import initialize, statsd, api
 
-# Datadog initialization
-options = {
-    'api_key': os.getenv("DATADOG_API_KEY"),
-    'app_key': os.getenv("DATADOG_APP_KEY")
-}
-initialize(**options)
+try:
+    from app.events import submit_event
+    from app.metrics import metrics
+    from app.cardinality import governor
+    from app.log_sink import request_log
+    from app import audit_store
+    from app.anomaly import detector
+    from app.stages import timed
+    from app.startup import tracer
+except ImportError:
+    from events import submit_event
+    from metrics import metrics
+    from cardinality import governor
+    from log_sink import request_log
+    import audit_store
+    from anomaly import detector
+    from stages import timed
+    from startup import tracer
 
 # Logger setup
 logger = logging.getLogger("llm-sentinel")
@@ -20,18 +30,25 @@ logger.setLevel(logging.INFO)
 
 
 # Enhanced Telemetry Logic
+@timed("record_metrics")
 def record_metrics(prompt: str = None,
                    response: str = None,
                    usage: dict = None,
                    security: dict = None,
+                   endpoint: str = None,
                    latency_ms: int = 0,
-                   error: bool = False):
+                   error: bool = False,
+                   cache_hit: bool = False,
+                   ttft_ms: float = None,
+                   inter_chunk_ms: list = None):
     """
     Finalized LLM telemetry for Judges:
     - Trace ID correlation
     - Length Ratio (Expansion/Compression)
     - Quality Proxy (Tokens Per Second)
-    - Contextual Alert Tags (Model, Snippet)
+    - Contextual Alert Tags (Model, Snippet), cardinality-governed
+    - Streaming: Time-to-First-Token and inter-chunk latency
+    - Online anomaly score (latency, tokens, block rate)
     """
     
     # Explicit Request ID / Trace Correlation
@@ -47,55 +64,111 @@ def record_metrics(prompt: str = None,
     tokens_out = usage.get("output_tokens", 0) if usage else 0
     tps = round(tokens_out / (latency_ms / 1000), 2) if latency_ms > 0 else 0
 
+    # Anomaly Detection: blocked, cached, shed, over-budget and circuit-open requests
+    # never reach upstream, and cancelled ones never finish, so they only feed the block rate
+    usage_info = usage or {}
+    blocked = bool(security and security.get("risk") == "high")
+    upstream = not (blocked or cache_hit or usage_info.get("circuit_open") or usage_info.get("shed")
+                    or usage_info.get("preflight_rejected") or usage_info.get("cancelled"))
+    anomaly = detector.observe(
+        model_id,
+        endpoint or "unknown",
+        latency_ms=latency_ms if upstream else None,
+        tokens=(usage_info.get("input_tokens", 0) + tokens_out
+                if upstream and not error and not usage_info.get("coalesced") else None),
+        blocked=blocked
+    )
+
     # Contextual Tags (For Datadog Alert Content)
     # Sanitize snippet for tag compatibility
     snippet = prompt[:40].replace(" ", "_").replace("\n", "") if prompt else "none"
+    category = security.get('category', 'clean') if security else 'clean'
+
+    # Per-request identifiers go to the span and the log only; the snippet
+    # keeps its own series only while it is a heavy hitter. Categories are
+    # the rulebook's fixed set, so every one is tagged from its first hit.
+    # The active span here is this function's own stage span; trace search
+    # and APM facets read the request's root span
+    span = tracer.current_root_span()
+    if span is not None:
+        span.set_tag("sentinel.trace_id", trace_id)
+        span.set_tag("sentinel.prompt_snippet", snippet)
+        span.set_tag("sentinel.route_reason", usage_info.get("route_reason", "none"))
     
     tags = [
         "service:llm-sentinel",
-        f"trace_id:{trace_id}",
         f"model:{model_id}",
-        f"prompt_snippet:{snippet}",
+        f"route_reason:{usage_info.get('route_reason', 'none')}",
+        f"endpoint:{endpoint or 'unknown'}",
+        f"prompt_snippet:{governor.govern('prompt_snippet', snippet)}",
         f"risk_level:{security.get('risk', 'low') if security else 'low'}",
-        f"category:{security.get('category', 'clean') if security else 'clean'}"
+        f"category:{category}",
+        f"rules_version:{security.get('rules_version', 'unknown') if security else 'unknown'}",
+        f"cache_hit:{'true' if cache_hit else 'false'}"
     ]
 
     # SEND DATADOG METRICS
-    statsd.gauge("sentinel.llm.latency", latency_ms, tags=tags)
-    statsd.gauge("sentinel.llm.length_ratio", length_ratio, tags=tags)
-    statsd.gauge("sentinel.llm.tps", tps, tags=tags)
-    statsd.increment("sentinel.llm.requests", tags=tags)
+    metrics.gauge("sentinel.llm.latency", latency_ms, tags=tags)
+    metrics.gauge("sentinel.llm.length_ratio", length_ratio, tags=tags)
+    metrics.gauge("sentinel.llm.tps", tps, tags=tags)
+    metrics.increment("sentinel.llm.requests", tags=tags)
+
+    # Streaming responses only
+    if ttft_ms is not None:
+        metrics.histogram("sentinel.llm.ttft", ttft_ms, tags=tags)
+    for gap_ms in inter_chunk_ms or ():
+        metrics.histogram("sentinel.llm.inter_chunk_latency", gap_ms, tags=tags)
     
     if error:
-        statsd.increment("sentinel.llm.error", tags=tags)
+        metrics.increment("sentinel.llm.error", tags=tags)
     
     if security and (security.get("injection_detected") or security.get("policy_violation")):
-        statsd.increment("sentinel.llm.security_violation", tags=tags)
+        metrics.increment("sentinel.llm.security_violation", tags=tags)
+
+    metrics.gauge("sentinel.llm.anomaly_score", anomaly["score"], tags=tags)
+    for kind in anomaly["flags"]:
+        metrics.increment("sentinel.llm.anomaly", tags=tags + [f"anomaly:{kind}"])
+
+    for dimension, series in governor.suppressed_series().items():
+        metrics.gauge("sentinel.telemetry.suppressed_series", series, tags=[f"dimension:{dimension}"])
 
     # CREATE DATADOG EVENT (For Incident/Alert)
-    if error or (security and security.get("risk") == "high"):
-        api.Event.create(
+    # Enqueued only: the background dispatcher talks to the Events API
+    if error or blocked or anomaly["flags"]:
+        submit_event(
             title=f"LLM Incident: {trace_id}",
             text=(f"Model: {model_id}\n"
                   f"Ratio: {length_ratio}\n"
+                  f"Anomaly score: {anomaly['score']} ({', '.join(anomaly['flags']) or 'none'})\n"
                   f"Snippet: {prompt[:100]}...\n"
-                  f"Remediation: High latency or risk detected. Investigate token size or fallback to Flash."),
-            tags=tags,
+                  f"Remediation: High latency or risk detected. Investigate token size; the model router falls back automatically on SLO breach."),
+            tags=tags + [f"trace_id:{trace_id}"],
             alert_type="error" if error else "warning"
         )
 
-    # Local JSON log with full Trace Correlation
+    # Local JSON Lines log with full Trace Correlation (written off the request path)
     log_entry = {
         "timestamp": int(time.time()),
         "trace_id": trace_id,
+        "model": model_id,
+        "route_reason": usage_info.get("route_reason"),
+        "endpoint": endpoint,
         "prompt": prompt,
         "response": response,
         "latency_ms": latency_ms,
+        "input_tokens": usage.get("input_tokens", 0) if usage else 0,
+        "output_tokens": tokens_out,
+        "input_tokens_estimated": usage_info.get("input_tokens_estimated"),
         "length_ratio": length_ratio,
         "tokens_per_second": tps,
         "error": error,
-        "security": security
+        "cache_hit": cache_hit,
+        "ttft_ms": ttft_ms,
+        "security": security,
+        "anomaly": anomaly
     }
-    logger.info(log_entry)
+    request_log.log(log_entry)
+    # Indexed copy for incident lookups by trace_id / category / time
+    audit_store.record(log_entry)
 
     return trace_id
\ No newline at end of file
@@ -0,0 +1,160 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    from app.metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+
+def _parse_prices(spec: str) -> dict:
+    """'model:in/out,...' (USD per 1M tokens) -> {model: (in, out)}"""
+    prices = {}
+    for part in spec.split(","):
+        if ":" in part and "/" in part:
+            name, pair = part.rsplit(":", 1)
+            price_in, price_out = pair.split("/", 1)
+            prices[name.strip()] = (float(price_in), float(price_out))
+    return prices
+
+
+# Configuration
+# Pre-flight limits; 0 disables a check
+MAX_INPUT_TOKENS = int(os.getenv("SENTINEL_MAX_INPUT_TOKENS", "32000"))
+MAX_REQUEST_COST_USD = float(os.getenv("SENTINEL_MAX_REQUEST_COST_USD", "0.01"))
+MODEL_PRICES = _parse_prices(os.getenv(
+    "SENTINEL_MODEL_PRICES", "gemini-2.0-flash:0.10/0.40,gemini-2.0-flash-lite:0.075/0.30"))
+# Output tokens assumed for a model until real responses have been seen
+DEFAULT_OUTPUT_TOKENS = float(os.getenv("SENTINEL_DEFAULT_OUTPUT_TOKENS", "256"))
+TOKEN_CACHE_SIZE = int(os.getenv("SENTINEL_TOKEN_CACHE_SIZE", "10000"))
+
+# Words, numbers and single punctuation marks; long words cost extra pieces
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def raw_token_count(text: str) -> int:
+    """Uncalibrated estimate: one token per short piece, plus one per 4 extra characters."""
+    if not text:
+        return 0
+    return sum(1 + (len(piece) - 1) // 4 for piece in _PIECES.findall(text))
+
+
+class TokenBudgetExceeded(Exception):
+    """Rejected before the call went out (not retryable)."""
+
+    def __init__(self, reason: str, estimated_tokens: int, projected_cost: float):
+        super().__init__(f"Request over the {reason} limit "
+                         f"(~{estimated_tokens} input tokens, ~${projected_cost:.4f} projected)")
+        self.reason = reason
+        self.estimated_tokens = estimated_tokens
+        self.projected_cost = projected_cost
+
+
+class TokenEstimator:
+    """
+    Fast local token counts for budgeting and metrics.
+
+    The raw count is a regex heuristic, cached per text hash (prompts
+    repeat a lot). Each model then gets an EWMA correction factor learned
+    from the real usage_metadata of its responses, separately for input
+    and output, plus a running average of output length used to project
+    the cost of a call before it is sent.
+    """
+
+    def __init__(self,
+                 max_input_tokens: int = MAX_INPUT_TOKENS,
+                 max_cost_usd: float = MAX_REQUEST_COST_USD,
+                 prices: dict = None,
+                 default_output_tokens: float = DEFAULT_OUTPUT_TOKENS,
+                 cache_size: int = TOKEN_CACHE_SIZE,
+                 alpha: float = 0.05):
+        self.max_input_tokens = max_input_tokens
+        self.max_cost_usd = max_cost_usd
+        self.prices = dict(MODEL_PRICES if prices is None else prices)
+        self.default_output_tokens = default_output_tokens
+        self.cache_size = cache_size
+        self.alpha = alpha
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # model -> correction factors and average output length
+        self._input_ratio = {}
+        self._output_ratio = {}
+        self._output_tokens = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _raw(self, text: str) -> int:
+        if not text:
+            return 0
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+        with self._lock:
+            count = self._cache.get(key)
+            if count is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return count
+        count = raw_token_count(text)
+        with self._lock:
+            self.cache_misses += 1
+            self._cache[key] = count
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return count
+
+    def estimate_input(self, model: str, prompt: str, system_instr: str = None) -> int:
+        raw = self._raw(prompt) + self._raw(system_instr)
+        return int(round(raw * self._input_ratio.get(model, 1.0)))
+
+    def estimate_output(self, model: str, text: str) -> int:
+        return int(round(self._raw(text) * self._output_ratio.get(model, 1.0)))
+
+    def projected_cost(self, model: str, input_tokens: int) -> float:
+        price_in, price_out = self.prices.get(model, (0.0, 0.0))
+        output_tokens = self._output_tokens.get(model, self.default_output_tokens)
+        return (input_tokens * price_in + output_tokens * price_out) / 1e6
+
+    def preflight(self, model: str, prompt: str, system_instr: str = None, tags: list = None) -> dict:
+        """Estimate, then raise TokenBudgetExceeded if the call should not go out."""
+        input_tokens = self.estimate_input(model, prompt, system_instr)
+        cost = self.projected_cost(model, input_tokens)
+        reason = None
+        if self.max_input_tokens and input_tokens > self.max_input_tokens:
+            reason = "input_tokens"
+        elif self.max_cost_usd and cost > self.max_cost_usd:
+            reason = "cost"
+        if reason:
+            metrics.increment("sentinel.llm.preflight_rejected", tags=(tags or []) + [f"reason:{reason}"])
+            raise TokenBudgetExceeded(reason, input_tokens, cost)
+        return {"input_tokens_estimated": input_tokens, "projected_cost_usd": round(cost, 6)}
+
+    def calibrate(self, model: str, prompt: str, system_instr: str, response_text: str,
+                  input_tokens: int, output_tokens: int):
+        """Learn from the real usage_metadata of one response."""
+        raw_in = self._raw(prompt) + self._raw(system_instr)
+        raw_out = self._raw(response_text)
+        with self._lock:
+            if input_tokens and raw_in:
+                self._update(self._input_ratio, model, input_tokens / raw_in)
+            if output_tokens and raw_out:
+                self._update(self._output_ratio, model, output_tokens / raw_out)
+            if output_tokens:
+                self._update(self._output_tokens, model, output_tokens, initial=output_tokens)
+
+    def _update(self, table: dict, model: str, value: float, initial: float = 1.0):
+        current = table.get(model, initial)
+        table[model] = current + self.alpha * (value - current)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "input_ratio": {m: round(r, 3) for m, r in self._input_ratio.items()},
+                "output_ratio": {m: round(r, 3) for m, r in self._output_ratio.items()},
+                "avg_output_tokens": {m: round(n, 1) for m, n in self._output_tokens.items()},
+                "cache": {"size": len(self._cache), "hits": self.cache_hits, "misses": self.cache_misses},
+            }
+
+
+estimator = TokenEstimator()
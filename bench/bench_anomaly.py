@@ -0,0 +1,106 @@
+"""
+Replay request logs through the online anomaly detector.
+
+    python bench/bench_anomaly.py [logs/requests.jsonl ...]
+    python bench/bench_anomaly.py --synthetic 500000
+
+With log files, records are replayed in order and flagged requests are
+listed. --synthetic generates a steady stream with injected latency
+spikes, token explosions and a block-rate burst, and reports the cost per
+observation and how many injected anomalies were caught.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.anomaly import AnomalyDetector
+from app.monitor import iter_records, normalize
+
+
+def observe_record(detector: AnomalyDetector, raw: dict) -> dict:
+    r = normalize(raw)
+    blocked = (raw.get("security") or {}).get("risk") == "high"
+    upstream = not (blocked or raw.get("cache_hit"))
+    return detector.observe(
+        r["model"], raw.get("endpoint") or "unknown",
+        latency_ms=r["latency_ms"] if upstream else None,
+        tokens=r["tokens"] if upstream and not r["error"] else None,
+        blocked=blocked,
+    )
+
+
+def replay(paths: list):
+    detector = AnomalyDetector()
+    count = flagged = 0
+    start = time.perf_counter()
+    for path in paths:
+        for raw in iter_records(path):
+            count += 1
+            result = observe_record(detector, raw)
+            if result["flags"]:
+                flagged += 1
+                print(f"{raw.get('trace_id', '?'):<14} score={result['score']:<6} {','.join(result['flags'])}")
+    elapsed = time.perf_counter() - start
+    print(f"\n{count:,} records, {flagged:,} flagged, {elapsed / max(count, 1) * 1e6:.2f} us/record (incl. parsing)")
+
+
+def synthetic(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    detector = AnomalyDetector()
+    injected = {"latency": set(), "tokens": set(), "block_rate": set()}
+    burst = range(n // 2, n // 2 + 40)
+    events = []
+    for i in range(n):
+        endpoint = "support" if i % 3 else "chat"
+        latency = rng.lognormvariate(6.6, 0.25)
+        tokens = int(rng.lognormvariate(5.5, 0.3))
+        blocked = rng.random() < 0.01 or (i in burst and rng.random() < 0.6)
+        if i % 5000 == 4999:
+            latency *= 8
+            injected["latency"].add(i)
+        elif i % 7000 == 6999:
+            tokens *= 12
+            injected["tokens"].add(i)
+        if i in burst:
+            injected["block_rate"].add(i)
+        events.append((endpoint, None if blocked else latency, None if blocked else tokens, blocked))
+
+    flagged = {"latency": set(), "tokens": set(), "block_rate": set()}
+    start = time.perf_counter()
+    for i, (endpoint, latency, tokens, blocked) in enumerate(events):
+        result = detector.observe("gemini-2.0-flash", endpoint, latency, tokens, blocked)
+        for kind in result["flags"]:
+            flagged[kind].add(i)
+    elapsed = time.perf_counter() - start
+
+    print(f"{n:,} observations: {elapsed / n * 1e6:.2f} us/observation")
+    for kind in ("latency", "tokens"):
+        caught = len(flagged[kind] & injected[kind])
+        false_pos = len(flagged[kind] - injected[kind])
+        print(f"{kind:>10}: caught {caught}/{len(injected[kind])}, false positives {false_pos} "
+              f"({false_pos / n * 100:.3f}% of requests)")
+    in_burst = flagged["block_rate"] & injected["block_rate"]
+    tail = range(burst.stop, burst.stop + 100)
+    outside = {i for i in flagged["block_rate"] - injected["block_rate"] if i not in tail}
+    first = min(in_burst) - burst.start if in_burst else None
+    print(f"block_rate: burst flagged after {first} requests, "
+          f"false positives {len(outside)} ({len(outside) / n * 100:.3f}% of requests)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument("--synthetic", type=int, default=0, help="generate N synthetic requests instead")
+    args = parser.parse_args()
+    if args.synthetic or not args.paths:
+        synthetic(args.synthetic or 500_000)
+    else:
+        replay(args.paths)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Audit store ingest and query latency at scale vs the old JSON-array file.
+
+    python bench/bench_audit_store.py [--records 10000000] [--legacy-records 200000]
+
+Records are written through AuditStore.write_batch (the writer thread's
+path). Query timings are averaged over random lookups. The legacy baseline
+is json.dump/json.load of one array plus a list-comprehension scan, the
+way save_logs.py / monitor.py work; it runs on a smaller sample because it
+holds everything in memory.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audit_store import AuditStore, find_by_trace, find_by_category, find_between, summary
+
+CATEGORIES = ["clean"] * 90 + ["injection"] * 5 + ["sensitive_data_leak"] * 3 + ["fraud"] * 2
+
+
+def make_record(i: int, start: float, span: float) -> dict:
+    category = CATEGORIES[i % len(CATEGORIES)]
+    return {
+        "timestamp": start + span * i,
+        "trace_id": f"{i:08x}-{i * 2654435761 % 0xFFFF:04x}",
+        "model": "gemini-2.0-flash",
+        "endpoint": "support" if i % 2 else "chat",
+        "prompt": f"How do I reset my password for account {i}?",
+        "response": "Go to Settings > Security and choose Reset password. " * 4,
+        "latency_ms": 600 + i % 900,
+        "length_ratio": 4.2,
+        "tokens_per_second": 38.0,
+        "error": i % 200 == 0,
+        "cache_hit": i % 7 == 0,
+        "ttft_ms": None,
+        "security": {"risk": "high" if category != "clean" else "low", "category": category,
+                     "rules_version": "2026.10.18-2"},
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_store(n: int, batch_size: int, path: str):
+    store = AuditStore(path, retention_interval=0)
+    start_ts = time.time() - 7 * 86400
+    span = 7 * 86400 / n
+
+    start = time.perf_counter()
+    batch = []
+    for i in range(n):
+        batch.append(make_record(i, start_ts, span))
+        if len(batch) == batch_size:
+            store.write_batch(batch)
+            batch = []
+        if i and i % 1_000_000 == 0:
+            print(f"  ... {i:,} records")
+    if batch:
+        store.write_batch(batch)
+    ingest = time.perf_counter() - start
+    size_mb = sum(os.path.getsize(path + ext) for ext in ("", "-wal") if os.path.exists(path + ext)) / 1e6
+    print(f"ingest: {n / ingest:,.0f} records/s ({ingest:.1f}s), {size_mb:,.0f} MB on disk")
+
+    rng = random.Random(7)
+    ids = [make_record(rng.randrange(n), start_ts, span)["trace_id"] for _ in range(200)]
+    it = iter(ids * 2)
+    print(f"find_by_trace:              {timed(lambda: find_by_trace(next(it), path=path), 200):8.3f} ms")
+
+    hour_ago = start_ts + 6 * 86400
+    print(f"find_by_category (1h, 100): {timed(lambda: find_by_category('injection', hour_ago, hour_ago + 3600, 100, path=path), 50):8.3f} ms")
+    print(f"find_between (1h, 100):     {timed(lambda: find_between(hour_ago, hour_ago + 3600, 100, path=path), 50):8.3f} ms")
+    print(f"summary (full scan):        {timed(lambda: summary(path=path), 1):8.1f} ms")
+
+
+def bench_legacy(n: int, directory: str):
+    path = os.path.join(directory, "llm_logs.json")
+    start_ts = time.time() - 7 * 86400
+    records = [make_record(i, start_ts, 7 * 86400 / n) for i in range(n)]
+    start = time.perf_counter()
+    with open(path, "w") as f:
+        json.dump(records, f)
+    write = time.perf_counter() - start
+    target = records[n // 2]["trace_id"]
+
+    def lookup():
+        with open(path) as f:
+            logs = json.load(f)
+        return [l for l in logs if l.get("trace_id") == target]
+
+    print(f"legacy @ {n:,}: rewrite {write * 1000:,.0f} ms, find by trace {timed(lookup, 3):,.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=10_000_000)
+    parser.add_argument("--legacy-records", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_legacy(args.legacy_records, tmp)
+        bench_store(args.records, args.batch, os.path.join(tmp, "audit.db"))
+
+
+if __name__ == "__main__":
+    main()
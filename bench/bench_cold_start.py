@@ -0,0 +1,116 @@
+"""
+Cold-start benchmark: import time of app.main and time to the first /chat
+response, each run in a fresh interpreter against the mock backend.
+
+    python bench/bench_cold_start.py [--runs 7] [--warmup background|blocking|off]
+                                     [--max-import-ms 300] [--max-first-response-ms 600]
+                                     [--baseline cold_start.json] [--tolerance 0.25]
+                                     [--save-baseline cold_start.json]
+
+"first response" is measured from interpreter start: imports, the app
+lifespan (including the warm-up when it blocks) and one /chat request.
+Exits 1 when a median is over its budget, or more than --tolerance over the
+baseline file, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import time
+t0 = time.perf_counter()
+import asyncio, json, sys
+sys.path.insert(0, sys.argv[1])
+from app.main import app
+import_ms = (time.perf_counter() - t0) * 1000
+import httpx
+
+async def first_response():
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://sentinel") as client:
+            r = await client.post("/chat", json={"prompt": "How do I export my account data?"})
+        done = time.perf_counter()
+    return r.status_code, (started - t0) * 1000, (done - started) * 1000, (done - t0) * 1000
+
+status, startup_ms, request_ms, total_ms = asyncio.run(first_response())
+print(json.dumps({"status": status, "import_ms": import_ms, "ready_ms": startup_ms,
+                  "request_ms": request_ms, "first_response_ms": total_ms}))
+"""
+
+FIELDS = ("import_ms", "ready_ms", "request_ms", "first_response_ms")
+
+
+def run_once(env: dict) -> dict:
+    out = subprocess.run([sys.executable, "-c", CHILD, ROOT], env=env, capture_output=True,
+                         text=True, timeout=120)
+    if out.returncode != 0:
+        raise RuntimeError(f"child failed:\n{out.stderr[-2000:]}")
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    if result["status"] != 200:
+        raise RuntimeError(f"first /chat returned {result['status']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--warmup", default="background", choices=("background", "blocking", "off"))
+    parser.add_argument("--max-import-ms", type=float, default=300)
+    parser.add_argument("--max-first-response-ms", type=float, default=600)
+    parser.add_argument("--baseline", help="JSON medians from --save-baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs the baseline")
+    parser.add_argument("--save-baseline")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="sentinel-bench-")
+    env = dict(os.environ)
+    env.update({
+        "SENTINEL_BACKEND": "mock",
+        "SENTINEL_MOCK_LATENCY_MS": "0",
+        "SENTINEL_WARMUP": args.warmup,
+        "SENTINEL_LOG_PATH": os.path.join(tmp, "requests.jsonl"),
+        "SENTINEL_AUDIT_DB": os.path.join(tmp, "audit.db"),
+    })
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    medians = {field: statistics.median(r[field] for r in runs) for field in FIELDS}
+
+    print(f"{args.runs} cold starts (warm-up: {args.warmup}, mock backend, 0 ms upstream)")
+    print(f"\n{'':<20} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for field in FIELDS:
+        values = [r[field] for r in runs]
+        print(f"{field:<20} {medians[field]:>10.1f} {min(values):>10.1f} {max(values):>10.1f}")
+
+    failures = []
+    budgets = {"import_ms": args.max_import_ms, "first_response_ms": args.max_first_response_ms}
+    for field, budget in budgets.items():
+        if budget and medians[field] > budget:
+            failures.append(f"{field} {medians[field]:.1f} ms over the {budget:g} ms budget")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for field in budgets:
+            if field in baseline and medians[field] > baseline[field] * (1 + args.tolerance):
+                failures.append(f"{field} {medians[field]:.1f} ms vs baseline {baseline[field]:.1f} ms "
+                                f"(+{args.tolerance:.0%} allowed)")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({field: round(value, 1) for field, value in medians.items()}, f, indent=2)
+        print(f"\nbaseline written to {args.save_baseline}")
+
+    if failures:
+        print("\nREGRESSION:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
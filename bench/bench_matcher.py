@@ -0,0 +1,122 @@
+"""
+Benchmark: compiled PatternMatcher vs the original per-keyword scans.
+
+    python bench/bench_matcher.py [--prompts 500] [--sizes 10,1000,10000]
+
+"legacy_in" is the old app/llm.py loop (`k in prompt.lower()` per keyword),
+"legacy_re" the old app/security.py loop (`re.search` per pattern).
+"""
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.matcher import PatternMatcher
+
+CATEGORIES = ["injection", "sensitive_data_leak", "fraud"]
+SEED_RULES = {
+    "injection": ["ignore previous instructions", "system prompt", "dan mode", "jailbreak"],
+    "sensitive_data_leak": ["ssn", "credit card", "password", "api key", "secret_key"],
+    "fraud": ["fake identity", "bank hack", "social security"],
+}
+FILLER = ("how do i reset my account settings for the billing dashboard and "
+          "export last month's invoices to csv before the quarterly review ")
+
+
+def make_rules(n: int, rng: random.Random) -> dict:
+    rules = {c: list(v) for c, v in SEED_RULES.items()}
+    total = sum(len(v) for v in rules.values())
+    while total < n:
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+                 for _ in range(rng.randint(1, 3))]
+        rules[rng.choice(CATEGORIES)].append(" ".join(words))
+        total += 1
+    if n < total:
+        flat = [(c, k) for c, v in rules.items() for k in v][:n]
+        rules = {c: [k for cc, k in flat if cc == c] for c in CATEGORIES}
+    return rules
+
+
+def make_prompts(n: int, rules: dict, rng: random.Random) -> list[str]:
+    flat = [k for v in rules.values() for k in v]
+    prompts = []
+    for _ in range(n):
+        body = FILLER * rng.randint(1, 6)
+        if rng.random() < 0.3:
+            cut = rng.randint(0, len(body))
+            body = body[:cut] + " " + rng.choice(flat).upper() + " " + body[cut:]
+        prompts.append(body)
+    return prompts
+
+
+def legacy_in(prompt: str, rules: dict) -> dict:
+    prompt_lower = prompt.lower()
+    hits = {}
+    for category, keywords in rules.items():
+        found = [k for k in keywords if k in prompt_lower]
+        if found:
+            hits[category] = found
+    return hits
+
+
+def legacy_re(prompt: str, rules: dict) -> dict:
+    hits = {}
+    for category, patterns in rules.items():
+        found = [p for p in patterns if re.search(p, prompt.lower())]
+        if found:
+            hits[category] = found
+    return hits
+
+
+def timed(fn, count: int, repeat: int = 3) -> float:
+    """Best-of-`repeat` seconds per item."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best / count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prompts", type=int, default=500)
+    parser.add_argument("--sizes", default="10,1000,10000")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'rules':>7} {'impl':>12} {'us/prompt':>12} {'speedup':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        rules = make_rules(size, rng)
+        prompts = make_prompts(args.prompts, rules, rng)
+
+        start = time.perf_counter()
+        matcher = PatternMatcher(rules)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        expected = [legacy_in(p, rules) for p in prompts]
+        assert [matcher.scan(p) for p in prompts] == expected, "scan mismatch"
+        assert matcher.scan_many(prompts) == expected, "scan_many mismatch"
+
+        # The per-pattern regex loop is too slow to run the whole corpus at 10k
+        sample = prompts[:20]
+        n = len(prompts)
+        results = {
+            "legacy_in": timed(lambda: [legacy_in(p, rules) for p in prompts], n),
+            "legacy_re": timed(lambda: [legacy_re(p, rules) for p in sample], len(sample), repeat=1),
+            "scan": timed(lambda: [matcher.scan(p) for p in prompts], n),
+            "scan_many": timed(lambda: matcher.scan_many(prompts), n),
+        }
+        base = results["legacy_in"]
+        for name, secs in results.items():
+            print(f"{size:>7} {name:>12} {secs * 1e6:>12.1f} {base / secs:>8.1f}x")
+        print(f"{size:>7} {'build':>12} {build_ms:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
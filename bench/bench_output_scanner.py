@@ -0,0 +1,73 @@
+"""
+Throughput of the incremental output scanner (MB/s) by chunk size, against
+re-scanning the accumulated response on every chunk.
+
+    python bench/bench_output_scanner.py [--mb 4] [--chunks 16,256,4096]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import rules
+from app.output_scanner import OutputScanner
+
+WORDS = ("the gateway forwards each request to the model and streams tokens back "
+         "while the dashboard tracks latency throughput and error budgets").split()
+SECRETS = ["api key", "password", "ssn", "secret_key"]
+
+
+def make_text(size: int, rng: random.Random) -> str:
+    out = []
+    total = 0
+    while total < size:
+        word = rng.choice(SECRETS) if rng.random() < 0.002 else rng.choice(WORDS)
+        out.append(word)
+        total += len(word) + 1
+    return " ".join(out)[:size]
+
+
+def incremental(text: str, chunk: int, mode: str) -> float:
+    scanner = OutputScanner(mode=mode)
+    start = time.perf_counter()
+    for i in range(0, len(text), chunk):
+        scanner.feed(text[i:i + chunk])
+    scanner.finish()
+    return time.perf_counter() - start
+
+
+def rescan_accumulated(text: str, chunk: int) -> float:
+    matcher = rules.active().output
+    start = time.perf_counter()
+    for i in range(chunk, len(text) + chunk, chunk):
+        list(matcher.finditer(text[:i]))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=float, default=4)
+    parser.add_argument("--chunks", default="16,256,4096")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    text = make_text(int(args.mb * 1024 * 1024), rng)
+    naive_text = text[:128 * 1024]
+    mb = len(text.encode()) / 1e6
+    naive_mb = len(naive_text.encode()) / 1e6
+
+    print(f"{'chunk':>6} {'mode':>9} {'MB/s':>9}")
+    for chunk in (int(c) for c in args.chunks.split(",")):
+        for mode in ("monitor", "redact"):
+            secs = incremental(text, chunk, mode)
+            print(f"{chunk:>6} {mode:>9} {mb / secs:>9.1f}")
+        secs = rescan_accumulated(naive_text, chunk)
+        print(f"{chunk:>6} {'rescan*':>9} {naive_mb / secs:>9.2f}")
+    print("* re-scans the whole accumulated text per chunk; measured on the first 128 KB only")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Per-request telemetry overhead: one DogStatsD datagram per call (the old
+record_metrics + emit_llm_metrics path) vs the pre-aggregating MetricsBuffer.
+
+    python bench/bench_telemetry.py [--requests 20000]
+
+Both variants send to a local UDP sink; the buffered figure includes its
+flush cost, amortized over the run.
+"""
+import argparse
+import os
+import socket
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datadog.dogstatsd import DogStatsd
+from app.metrics import MetricsBuffer
+
+
+def request_metrics(client, i: int, unique_tags: bool):
+    """The metric calls one /chat request used to make."""
+    trace = str(uuid.uuid4())[:13] if unique_tags else "shared"
+    tags = ["service:llm-sentinel", f"trace_id:{trace}", "model:gemini-2.0-flash",
+            "prompt_snippet:How_do_I", "risk_level:low", "category:clean"]
+    client.gauge("sentinel.llm.latency", 800 + i % 400, tags=tags)
+    client.gauge("sentinel.llm.length_ratio", 3.2, tags=tags)
+    client.gauge("sentinel.llm.tps", 41.5, tags=tags)
+    client.increment("sentinel.llm.requests", tags=tags)
+    endpoint_tags = ["model:gemini-2.0-flash", "endpoint:chat"]
+    client.increment("llm.request.count", tags=endpoint_tags)
+    client.gauge("llm.tokens.prompt", 12, tags=endpoint_tags)
+    client.gauge("llm.tokens.completion", 180, tags=endpoint_tags)
+    client.histogram("llm.latency.ms", 850 + i % 400, tags=endpoint_tags)
+
+
+def run(client, n: int, unique_tags: bool, flush=None) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        request_metrics(client, i, unique_tags)
+    if flush:
+        flush()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    n = args.requests
+
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    sink.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+    host, port = sink.getsockname()
+
+    print(f"{'variant':>28} {'us/request':>11} {'datagrams':>10}")
+    for unique_tags in (True, False):
+        label = "unique trace tag" if unique_tags else "shared tags"
+
+        legacy = DogStatsd(host=host, port=port, disable_telemetry=True)
+        secs = run(legacy, n, unique_tags)
+        print(f"{'per-call statsd, ' + label:>28} {secs / n * 1e6:>11.2f} {n * 8:>10}")
+
+        # Interval long enough that only the final explicit flush fires
+        buffered = MetricsBuffer(host=host, port=port, flush_interval=3600)
+        secs = run(buffered, n, unique_tags, flush=buffered.flush)
+        print(f"{'buffered, ' + label:>28} {secs / n * 1e6:>11.2f} {buffered.datagrams_sent:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep imports of the app local: mock upstream, logs and audit store in a temp dir
+_tmp = tempfile.mkdtemp(prefix="sentinel-tests-")
+os.environ.setdefault("SENTINEL_BACKEND", "mock")
+os.environ.setdefault("SENTINEL_LOG_PATH", os.path.join(_tmp, "requests.jsonl"))
+os.environ.setdefault("SENTINEL_AUDIT_DB", os.path.join(_tmp, "audit.db"))
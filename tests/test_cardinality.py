@@ -0,0 +1,14 @@
+from app.cardinality import TagGovernor, OTHER
+
+
+def test_first_injection_keeps_its_category_tag():
+    governor = TagGovernor()
+    assert governor.govern("category", "injection") == "injection"
+
+
+def test_open_ended_dimensions_fold_rare_values():
+    governor = TagGovernor(min_count=3)
+    assert governor.govern("prompt_snippet", "How_do_I") == OTHER
+    assert governor.govern("api_key", "key:abc") == OTHER
+    governor.govern("prompt_snippet", "How_do_I")
+    assert governor.govern("prompt_snippet", "How_do_I") == "How_do_I"
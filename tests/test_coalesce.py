@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import pytest
+
+from app.coalesce import SingleFlight
+from app.deadline import DeadlineExceeded, remaining_seconds
+
+
+def _upstream(seconds: float, seen: list):
+    async def call(latest_deadline):
+        await asyncio.sleep(seconds)
+        seen.append(remaining_seconds(latest_deadline))
+        return "answer"
+    return call
+
+
+def test_follower_outlives_a_leader_with_a_shorter_deadline():
+    flight, seen = SingleFlight(), []
+
+    async def scenario():
+        now = time.monotonic()
+        leader = asyncio.create_task(flight.do("k", _upstream(0.2, seen), deadline=now + 0.05))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", _upstream(0.2, seen), deadline=now + 30))
+        with pytest.raises(DeadlineExceeded):
+            await leader
+        assert await follower == ("answer", True)
+
+    asyncio.run(scenario())
+    # The shared call ran on the follower's deadline once the leader left
+    assert seen[0] > 20
+
+
+def test_follower_is_bound_by_its_own_shorter_deadline():
+    flight, seen = SingleFlight(), []
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do("k", _upstream(0.2, seen)))
+        await asyncio.sleep(0)
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            await flight.do("k", _upstream(0.2, seen), deadline=start + 0.05)
+        assert time.monotonic() - start < 0.15
+        assert await leader == ("answer", False)
+
+    asyncio.run(scenario())
+
+
+def test_shared_call_is_cancelled_when_every_waiter_ran_out():
+    flight, seen = SingleFlight(), []
+
+    async def scenario():
+        now = time.monotonic()
+        waiters = [asyncio.create_task(flight.do("k", _upstream(0.2, seen), deadline=now + 0.05))
+                   for _ in range(3)]
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(r, DeadlineExceeded) for r in results)
+        await asyncio.sleep(0.25)
+
+    asyncio.run(scenario())
+    assert seen == [] and len(flight) == 0
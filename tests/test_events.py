@@ -0,0 +1,24 @@
+import threading
+import time
+
+import pytest
+
+from app.events import EventDispatcher
+
+
+def test_full_queue_drops_without_waiting():
+    gate = threading.Event()
+    dispatcher = EventDispatcher(maxsize=1, batch_size=1, sender=lambda event: gate.wait())
+    try:
+        start = time.perf_counter()
+        results = [dispatcher.submit(title=f"incident {i}") for i in range(20)]
+        assert time.perf_counter() - start < 0.05
+        assert not all(results) and dispatcher.dropped > 0
+    finally:
+        gate.set()
+        dispatcher.flush()
+
+
+def test_blocking_policy_is_rejected():
+    with pytest.raises(ValueError):
+        EventDispatcher(policy="block")
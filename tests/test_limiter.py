@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app import llm
+from app.admission import AdmissionController
+from app.limiter import AdaptiveLimiter, CircuitBreaker, CircuitOpenError, CLOSED, HALF_OPEN
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fresh breaker (already failed once, so the next call probes), limiter and admission."""
+    breaker = CircuitBreaker(threshold=1, open_seconds=0)
+    breaker.record_failure()
+    limiter = AdaptiveLimiter(initial=1)
+    monkeypatch.setattr(llm, "breaker", breaker)
+    monkeypatch.setattr(llm, "limiter", limiter)
+    monkeypatch.setattr(llm, "admission", AdmissionController(capacity=lambda: 8))
+    return breaker, limiter
+
+
+def test_cancelled_probe_frees_the_probe_slot(upstream):
+    breaker, limiter = upstream
+
+    async def scenario():
+        # Every upstream slot is taken, so the probe queues and is cancelled there
+        await limiter.acquire()
+        probe = asyncio.create_task(llm._acquire_upstream("chat"))
+        await asyncio.sleep(0.01)
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await llm._acquire_upstream("chat")
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        limiter.release(10)
+
+        # The next call becomes the probe instead of failing fast forever
+        start, is_probe = await llm._acquire_upstream("chat")
+        assert is_probe
+        llm._release_upstream(start, probe=is_probe)
+
+    asyncio.run(scenario())
+    assert breaker.state == CLOSED
+
+
+def test_non_probe_cancellation_keeps_the_probe_slot(upstream):
+    breaker, limiter = upstream
+
+    async def scenario():
+        start, is_probe = await llm._acquire_upstream("chat")
+        assert is_probe
+        # A hedge loser or a disconnected request that was not the probe
+        llm._release_upstream(start, asyncio.CancelledError(), probe=False)
+        with pytest.raises(CircuitOpenError):
+            await llm._acquire_upstream("chat")
+
+    asyncio.run(scenario())
+
+
+def test_in_flight_follows_the_limit_up_while_queued():
+    limiter = AdaptiveLimiter(initial=2, max_limit=64)
+
+    async def worker(stop: asyncio.Event):
+        while not stop.is_set():
+            await limiter.acquire()
+            await asyncio.sleep(0.001)
+            limiter.release(1.0)
+
+    async def scenario():
+        stop = asyncio.Event()
+        workers = [asyncio.create_task(worker(stop)) for _ in range(50)]
+        await asyncio.sleep(0.3)
+        stats = limiter.stats()
+        stop.set()
+        await asyncio.gather(*workers)
+        return stats
+
+    stats = asyncio.run(scenario())
+    # Additive increase has to reach the queue, not just the number
+    assert stats["limit"] > 10
+    assert stats["in_flight"] >= min(int(stats["limit"]), 50) - 5
+    assert limiter.in_flight == 0
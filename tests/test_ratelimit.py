@@ -0,0 +1,15 @@
+import pytest
+
+from app.ratelimit import RateLimiter, Throttled
+
+
+def test_oversized_batch_puts_the_key_into_debt():
+    now = [0.0]
+    limiter = RateLimiter(request_rate=2, request_burst=20, clock=lambda: now[0])
+    limiter.check("key", cost=1000, allow_debt=True)
+    with pytest.raises(Throttled) as exc:
+        limiter.check("key")
+    # 981 requests in debt at 2/s before the next one is allowed
+    assert exc.value.retry_after == pytest.approx(490.5)
+    now[0] = 491
+    limiter.check("key")
@@ -0,0 +1,12 @@
+from ddtrace import tracer
+
+from app.telemetry import record_metrics
+
+
+def test_request_tags_land_on_the_root_span():
+    with tracer.trace("fastapi.request") as root:
+        trace_id = record_metrics(prompt="How do I export my data?", response="Go to settings.",
+                                  usage={"model": "gemini-2.0-flash", "route_reason": "primary"},
+                                  endpoint="chat", latency_ms=120)
+    assert root.get_tag("sentinel.trace_id") == trace_id
+    assert root.get_tag("sentinel.route_reason") == "primary"